@@ -1,8 +1,24 @@
-from flask import Flask, render_template, request, redirect, url_for
-from flask_cors import CORS
-import pickle, json, os, uuid, datetime as dt
-import numpy as np
-import pandas as pd
+from healthapp.serving.startup import StartupProfiler, block_import
+
+# Boot phases are timed so cold start can be tracked (STARTUP_REPORT=1 prints them).
+startup = StartupProfiler()
+with startup.phase("import flask"):
+    from flask import Flask, render_template, request, redirect, url_for, jsonify, stream_template
+    from flask_cors import CORS
+import atexit, os, time, uuid, datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+with startup.phase("import numpy"):
+    import numpy as np
+# sklearn, scipy and pandas are only imported when the first model is unpickled.
+with startup.phase("import serving"):
+    from healthapp.serving.registry import ModelRegistry
+    from healthapp.serving.results_store import ResultsStore
+    from healthapp.serving.writer import RecordWriter
+    from healthapp.serving.compactor import ResultsCompactor
+    from healthapp.serving.stats import ScreeningStats
+    from healthapp.serving.coalescer import PredictionCoalescer
+    from healthapp.serving.cache import PredictionCache
+    from healthapp.serving.metrics import MetricsRegistry
 
 app = Flask(__name__)
 CORS(app)
@@ -12,6 +28,9 @@ disease_configs = {
     "heart": {
          "MODEL_PATH": "healthapp/Heart/final_models/heart_model.pkl",
          "PREPROCESSOR_PATH": "healthapp/Heart/final_models/heart_preprocessor.pkl",
+         "COMPILED_PREPROCESSOR_PATH": "healthapp/Heart/final_models/heart_compiled_preprocessor.pkl",
+         "COMPILED_MODEL_PATH": "healthapp/Heart/final_models/heart_compiled_model.pkl",
+         "BUNDLE_PATH": "healthapp/Heart/final_models/heart_bundle",
          "RESULTS_FILE": os.path.join("Results", "Heart", "results.txt"),
          "PREDICTION_FEATURES": ['cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang'],
          "INPUT_TEMPLATE": "heart.html",
@@ -20,6 +39,9 @@ disease_configs = {
     "diabetes": {
          "MODEL_PATH": "healthapp/Diabetes/final_models/diabetes_model.pkl",
          "PREPROCESSOR_PATH": "healthapp/Diabetes/final_models/diabetes_preprocessor.pkl",
+         "COMPILED_PREPROCESSOR_PATH": "healthapp/Diabetes/final_models/diabetes_compiled_preprocessor.pkl",
+         "COMPILED_MODEL_PATH": "healthapp/Diabetes/final_models/diabetes_compiled_model.pkl",
+         "BUNDLE_PATH": "healthapp/Diabetes/final_models/diabetes_bundle",
          "RESULTS_FILE": os.path.join("Results", "Diabetes", "results.txt"),
          "PREDICTION_FEATURES": ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'],
          "INPUT_TEMPLATE": "diabetes.html",
@@ -28,6 +50,9 @@ disease_configs = {
     "cancer": {
          "MODEL_PATH": "healthapp/Cancer/final_models/cancer_model.pkl",
          "PREPROCESSOR_PATH": "healthapp/Cancer/final_models/cancer_preprocessor.pkl",
+         "COMPILED_PREPROCESSOR_PATH": "healthapp/Cancer/final_models/cancer_compiled_preprocessor.pkl",
+         "COMPILED_MODEL_PATH": "healthapp/Cancer/final_models/cancer_compiled_model.pkl",
+         "BUNDLE_PATH": "healthapp/Cancer/final_models/cancer_bundle",
          "RESULTS_FILE": os.path.join("Results", "Cancer", "results.txt"),
          "PREDICTION_FEATURES": ['concave points_mean', 'area_mean', 'radius_mean', 'perimeter_mean', 'concavity_mean'],
          "INPUT_TEMPLATE": "cancer.html",
@@ -36,6 +61,9 @@ disease_configs = {
     "kidney": {
          "MODEL_PATH": "healthapp/Kidney/final_models/kidney_model.pkl",
          "PREPROCESSOR_PATH": "healthapp/Kidney/final_models/kidney_preprocessor.pkl",
+         "COMPILED_PREPROCESSOR_PATH": "healthapp/Kidney/final_models/kidney_compiled_preprocessor.pkl",
+         "COMPILED_MODEL_PATH": "healthapp/Kidney/final_models/kidney_compiled_model.pkl",
+         "BUNDLE_PATH": "healthapp/Kidney/final_models/kidney_bundle",
          "RESULTS_FILE": os.path.join("Results", "Kidney", "results.txt"),
          # IMPORTANT: Update the kidney feature names to match those used at fit time.
          # In this example, we assume your training pipeline was fitted using these names:
@@ -46,6 +74,9 @@ disease_configs = {
     "liver": {
          "MODEL_PATH": "healthapp/Liver/final_models/liver_model.pkl",
          "PREPROCESSOR_PATH": "healthapp/Liver/final_models/liver_preprocessor.pkl",
+         "COMPILED_PREPROCESSOR_PATH": "healthapp/Liver/final_models/liver_compiled_preprocessor.pkl",
+         "COMPILED_MODEL_PATH": "healthapp/Liver/final_models/liver_compiled_model.pkl",
+         "BUNDLE_PATH": "healthapp/Liver/final_models/liver_bundle",
          "RESULTS_FILE": os.path.join("Results", "Liver", "results.txt"),
          "PREDICTION_FEATURES": ['Total_Bilirubin', 'Direct_Bilirubin', 'Alkaline_Phosphotase', 'Alamine_Aminotransferase', 'Total_Protiens', 'Albumin', 'Albumin_and_Globulin_Ratio'],
          "INPUT_TEMPLATE": "liver.html",
@@ -53,35 +84,409 @@ disease_configs = {
     }
 }
 
+# Artefacts are loaded once per process and hot-reloaded when `final_models/`
+# changes on disk; MODEL_RELOAD_INTERVAL=0 disables the background watcher.
+# Under `gunicorn -c gunicorn.conf.py` they are loaded once in the master and
+# shared with the forked workers (see start_background below).
+# MODEL_LOAD_MODE: "eager" loads every disease before serving, "parallel" does the
+# same on MODEL_LOAD_WORKERS threads, "lazy" starts serving at once and loads in
+# the background (a request for a disease that isn't loaded yet loads it).
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager")
+
+# Inference never needs pandas, but sklearn imports it whenever it is installed.
+# SERVE_WITHOUT_PANDAS=1 hides it from this process before any model is unpickled
+# (sklearn then behaves as if pandas were absent), saving its import time and memory.
+if os.getenv("SERVE_WITHOUT_PANDAS", "1") == "1":
+    block_import("pandas")
+registry = ModelRegistry(
+    disease_configs,
+    poll_interval=float(os.getenv("MODEL_RELOAD_INTERVAL", "5")),
+    load_workers=int(os.getenv("MODEL_LOAD_WORKERS", str(len(disease_configs)))) if MODEL_LOAD_MODE == "parallel" else 1,
+    lazy=MODEL_LOAD_MODE == "lazy",
+)
+if MODEL_LOAD_MODE != "lazy" or os.getenv("GUNICORN_PRELOAD", "0") == "1":
+    with startup.phase("load models"):
+        registry.refresh()
+
+# One indexed store per disease so /results can fetch a record by id with a seek.
+# The active file rolls over into Results/<Disease>/segments/ once it reaches
+# RESULTS_SEGMENT_BYTES or RESULTS_SEGMENT_SECONDS; sealed segments are compacted
+# into compressed columnar archives every RESULTS_COMPACT_INTERVAL seconds, and the
+# oldest archives are dropped beyond RESULTS_RETAIN_BYTES (0 = keep everything).
+stores = {
+    d: ResultsStore(
+        cfg["RESULTS_FILE"],
+        segment_bytes=int(os.getenv("RESULTS_SEGMENT_BYTES", str(8 * 2 ** 20))),
+        segment_seconds=float(os.getenv("RESULTS_SEGMENT_SECONDS", "86400")),
+        retain_bytes=int(os.getenv("RESULTS_RETAIN_BYTES", "0")),
+    )
+    for d, cfg in disease_configs.items()
+}
+
+HIGH_RISK_MSG = "🔴 High Risk – please consult a doctor."
+LOW_RISK_MSG = "🟢 Low Risk – stay healthy!"
+
+def _outcome(rec: dict) -> str:
+    prediction = rec.get("Prediction")
+    return "high_risk" if prediction == HIGH_RISK_MSG else "low_risk" if prediction == LOW_RISK_MSG else "error"
+
+# Running aggregates behind /api/stats/<disease>: folded in as records are written,
+# caught up from the log on read, and checkpointed beside each results file by
+# the compactor so a restart only re-reads what came after the checkpoint.
+stats = {
+    d: ScreeningStats(
+        stores[d], cfg["PREDICTION_FEATURES"], _outcome,
+        hourly_buckets=int(os.getenv("STATS_HOURLY_BUCKETS", "168")),
+        daily_buckets=int(os.getenv("STATS_DAILY_BUCKETS", "366")),
+    )
+    for d, cfg in disease_configs.items()
+}
+compactor = ResultsCompactor(stores, interval=float(os.getenv("RESULTS_COMPACT_INTERVAL", "60")), stats=stats)
+
+# Records are persisted write-behind: requests enqueue and a background thread
+# group-commits every RESULTS_FLUSH_INTERVAL_MS / RESULTS_FLUSH_SIZE records.
+# RESULTS_WRITE_BEHIND=0 writes synchronously inside the request instead. A
+# failed append is retried up to RESULTS_WRITE_ATTEMPTS times before the batch
+# is dropped (and counted in prediction_errors_total{stage="persist"}).
+writer = RecordWriter(
+    stores,
+    max_queue=int(os.getenv("RESULTS_QUEUE_SIZE", "10000")),
+    flush_interval=float(os.getenv("RESULTS_FLUSH_INTERVAL_MS", "50")) / 1000,
+    flush_size=int(os.getenv("RESULTS_FLUSH_SIZE", "256")),
+    fsync=os.getenv("RESULTS_FSYNC", "0") == "1",
+    max_attempts=int(os.getenv("RESULTS_WRITE_ATTEMPTS", "3")),
+)
+RESULTS_WRITE_BEHIND = os.getenv("RESULTS_WRITE_BEHIND", "1") == "1"
+
+# Memoised predictions keyed by disease, model version and the canonical feature
+# vector; entries for a disease are dropped as soon as a new model is promoted.
+prediction_cache = PredictionCache(
+    maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "3600")),
+)
+registry.add_listener(lambda disease, bundle: prediction_cache.invalidate(disease))
+
+# Opt-in micro-batching of concurrent /predict requests: rows arriving within
+# PREDICT_COALESCE_WINDOW_MS of each other (up to PREDICT_COALESCE_MAX_BATCH)
+# share one transform/predict call; a request waits at most
+# PREDICT_COALESCE_TIMEOUT_MS for its result.
+coalescer = None
+if os.getenv("PREDICT_COALESCE", "0") == "1":
+    coalescer = PredictionCoalescer(
+        lambda disease, matrix: _score(disease, matrix),
+        window=float(os.getenv("PREDICT_COALESCE_WINDOW_MS", "2")) / 1000,
+        max_batch=int(os.getenv("PREDICT_COALESCE_MAX_BATCH", "64")),
+        timeout=float(os.getenv("PREDICT_COALESCE_TIMEOUT_MS", "1000")) / 1000,
+    )
+
+def start_background():
+    """
+    Start this process's background threads: the model watcher, the
+    write-behind writer and the results compactor. Threads don't survive fork,
+    so with gunicorn's preload_app the master skips this and each worker calls
+    it from post_fork.
+    """
+    registry.start()
+    # atexit runs in reverse: the writer drains first, then the stats are saved.
+    atexit.register(compactor.checkpoint)
+    if RESULTS_WRITE_BEHIND:
+        writer.start()
+        atexit.register(writer.stop)
+    compactor.start()
+
+if os.getenv("GUNICORN_PRELOAD", "0") != "1":
+    start_background()
+
+# Upper bound on rows accepted by one /api/predict call.
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+
+# Prometheus metrics served at /metrics (per worker process).
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    "prediction_stage_seconds", "Time spent in each stage of a prediction request.",
+    ("stage", "disease", "version"))
+prediction_errors = metrics.counter(
+    "prediction_errors_total", "Failed prediction requests by stage.", ("stage", "disease"))
+writer.on_drop = lambda disease, count: prediction_errors.inc(("persist", disease), count)
+cache_hits = metrics.counter("prediction_cache_hits_total", "Rows answered from the prediction cache.", ("disease",))
+cache_misses = metrics.counter("prediction_cache_misses_total", "Rows that had to be scored.", ("disease",))
+
+# /api/screen runs the selected diseases' models concurrently on this pool.
+# Threads are created on first use, so each gunicorn worker gets its own.
+screen_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SCREEN_WORKERS", str(len(disease_configs)))),
+                                 thread_name_prefix="screen")
+
+# History page size for /results?view=all (overridable per request up to the max).
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", "20"))
+RESULTS_MAX_PAGE_SIZE = 200
+
 # ─────────────────────── Helper Functions ───────────────────────
 def load_artifacts(disease: str):
-    """Load model and preprocessor for the given disease."""
-    try:
-        cfg = disease_configs[disease]
-        model = pickle.load(open(cfg["MODEL_PATH"], "rb"))
-        preprocessor = pickle.load(open(cfg["PREPROCESSOR_PATH"], "rb"))
-        print(f"✅ {disease.capitalize()} model & pre-processor loaded.")
-        return model, preprocessor
-    except Exception as e:
-        print(f"❌ Couldn't load {disease} artefacts: {e}")
+    """Return the cached model and preprocessor for the given disease (array-backed when loaded from a bundle)."""
+    bundle = registry.get(disease)
+    if bundle is None:
         return None, None
+    model = bundle.model if bundle.model is not None else bundle.engine
+    preprocessor = bundle.preprocessor if bundle.preprocessor is not None else bundle.compiled
+    return model, preprocessor
 
 def _save_record(disease: str, rec: dict):
     """Append a record (as JSON) to the disease-specific results file."""
-    cfg = disease_configs[disease]
-    results_file = cfg["RESULTS_FILE"]
-    os.makedirs(os.path.dirname(results_file), exist_ok=True)
-    with open(results_file, "a", encoding="utf-8") as fp:
-        fp.write(json.dumps(rec) + "\n")
+    _save_records(disease, [rec])
+
+def _save_records(disease: str, recs: list):
+    """Hand records to the write-behind writer (or write them directly if it is off)."""
+    writer.submit(disease, recs)
+
+def _queued(rec_id: str):
+    """"1" while a record is still in this worker's write-behind queue, for the redirect to /results."""
+    return "1" if writer.pending(rec_id) is not None else None
+
+def _get_record(disease: str, rec_id: str, queued: bool = False):
+    """
+    Look a record up by id, read-your-write safe: records still queued in this
+    worker come from the writer, and a record the redirect marked `queued`
+    (it may sit in another worker's queue) is waited for up to a few flush
+    intervals. Any other id is a single lookup, so unknown ids return at once.
+    """
+    rec = writer.pending(rec_id)
+    if rec is not None:
+        return rec
+    return stores[disease].get(rec_id, wait=4 * writer.flush_interval + 0.1 if queued else 0.0)
+
+def _new_record(disease: str, values: dict, msg: str) -> dict:
+    """Build the stored record for one prediction."""
+    return {
+        "id": str(uuid.uuid4()),
+        "ts": dt.datetime.now(dt.timezone.utc).isoformat(),
+        **{k: values.get(k, "") for k in disease_configs[disease]["PREDICTION_FEATURES"]},
+        "Prediction": msg
+    }
+
+def _risk_message(y_hat) -> str:
+    return HIGH_RISK_MSG if y_hat == 1 else LOW_RISK_MSG
+
+def _score(disease: str, matrix: np.ndarray) -> np.ndarray:
+    """Run preprocessor + model on a (n_rows, n_features) matrix in PREDICTION_FEATURES order."""
+    bundle = registry.get(disease)
+    if bundle is None:
+        raise RuntimeError(f"Error loading {disease} model")
+    t0 = time.perf_counter()
+    X = bundle.transform(matrix)
+    t1 = time.perf_counter()
+    y_hat = bundle.predict(X)
+    t2 = time.perf_counter()
+    stage_seconds.observe(("transform", disease, bundle.version), t1 - t0)
+    stage_seconds.observe(("predict", disease, bundle.version), t2 - t1)
+    return y_hat
+
+def _score_cached(disease: str, matrix: np.ndarray, score=None) -> np.ndarray:
+    """
+    _score() behind the prediction cache: cached rows are answered directly and
+    the remaining rows are scored together with `score` (default _score).
+    """
+    bundle = registry.get(disease)
+    if bundle is None:
+        raise RuntimeError(f"Error loading {disease} model")
+    keys = [prediction_cache.key(disease, bundle.version, row) for row in matrix]
+    y_hat = [prediction_cache.get(k) for k in keys]
+    todo = [i for i, y in enumerate(y_hat) if y is None]
+    if len(todo) < len(keys):
+        cache_hits.inc((disease,), len(keys) - len(todo))
+    if todo:
+        cache_misses.inc((disease,), len(todo))
+        fresh = (score or _score)(disease, matrix[todo])
+        for i, y in zip(todo, fresh):
+            y_hat[i] = y
+            prediction_cache.put(keys[i], y)
+    return np.asarray(y_hat)
+
+def _parse_batch(rows: list, features: list):
+    """
+    Validate JSON rows against the disease's PREDICTION_FEATURES and pack them
+    into one float matrix in feature order. Returns (matrix, errors).
+    """
+    matrix = np.empty((len(rows), len(features)), dtype=np.float64)
+    errors = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"row": i, "error": "record must be an object"})
+            continue
+        missing = [k for k in features if k not in row]
+        if missing:
+            errors.append({"row": i, "error": f"missing features: {missing}"})
+            continue
+        try:
+            matrix[i] = [float(row[k]) for k in features]
+        except (TypeError, ValueError) as e:
+            errors.append({"row": i, "error": f"non-numeric feature value: {e}"})
+    return matrix, errors
+
+def _screen_one(disease: str, patient: dict) -> dict:
+    """Score one patient for one disease (runs on screen_pool); never raises."""
+    start = time.perf_counter()
+    out, matrix = _screen_input(disease, patient)
+    if matrix is not None:
+        try:
+            out["y_hat"] = _score_cached(disease, matrix)[0]
+        except Exception as e:
+            out["error"] = _failure_message("predict", disease, e)
+    return _screen_done(out, start)
+
+# ─────────────────────── Request handling ───────────────────────
+# Everything the routes do apart from reading the request and awaiting I/O, so
+# asgi.py serves the same contract by calling these around its awaits.
+FAILURE_STATUS = {"parse": 400, "load": 503, "predict": 500}
+
+def _failure_message(stage: str, disease: str, error=None) -> str:
+    if stage == "load":
+        return f"Error loading {disease} model"
+    if stage == "predict":
+        return f"Error during prediction: {error}"
+    return f"Error processing form: {error}"
+
+def _failure(stage: str, disease: str, error=None) -> tuple:
+    """Count a request that failed at `stage` in prediction_errors; returns (message, HTTP status)."""
+    prediction_errors.inc((stage, disease))
+    return _failure_message(stage, disease, error), FAILURE_STATUS[stage]
+
+def _observe_stages(disease: str, bundle, **seconds) -> None:
+    version = bundle.version if bundle is not None else "none"
+    for stage, s in seconds.items():
+        stage_seconds.observe((stage, disease, version), s)
+
+def _form_row(disease: str, form):
+    """
+    The /predict form as a (1, n_features) matrix, missing fields counting as
+    0. Returns (row, None), or (None, error message) for a non-numeric value.
+    """
+    try:
+        return np.array([[float(form.get(k, 0)) for k in disease_configs[disease]["PREDICTION_FEATURES"]]]), None
+    except Exception as e:
+        return None, _failure("parse", disease, e)[0]
+
+def _form_page(disease: str, message: str) -> tuple:
+    """(template, context) of the input form showing `message`."""
+    return disease_configs[disease]["INPUT_TEMPLATE"], {"prediction_text": f"❌ {message}", "disease": disease}
+
+def _current_result(disease: str, record: dict) -> dict:
+    """url_for arguments of the /results page a /predict redirects to."""
+    return {"disease": disease, "id": record["id"], "view": "current", "queued": _queued(record["id"])}
+
+def _batch_payload(disease: str, payload):
+    """
+    Validate an /api/predict body, either a bare list of records or
+    {"records": [...]}. Returns (rows, matrix, None), or (None, None,
+    (error body, HTTP status)).
+    """
+    rows = payload.get("records") if isinstance(payload, dict) else payload
+    if not isinstance(rows, list) or not rows:
+        return None, None, ({"error": "Request body must be a non-empty JSON list of records"}, 400)
+    if len(rows) > MAX_BATCH_ROWS:
+        return None, None, ({"error": f"Batch too large (max {MAX_BATCH_ROWS} records)"}, 413)
+    matrix, errors = _parse_batch(rows, disease_configs[disease]["PREDICTION_FEATURES"])
+    if errors:
+        prediction_errors.inc(("parse", disease))
+        return None, None, ({"error": "Invalid records", "details": errors}, 400)
+    return rows, matrix, None
+
+def _batch_response(disease: str, bundle, rows: list, y_hat) -> tuple:
+    """The records to store for a scored batch and the /api/predict response body."""
+    records = [_new_record(disease, row, _risk_message(y)) for row, y in zip(rows, y_hat)]
+    return records, {
+        "disease": disease,
+        "model_version": bundle.version,
+        "count": len(records),
+        "results": [{"id": r["id"], "high_risk": bool(y == 1), "Prediction": r["Prediction"]}
+                    for r, y in zip(records, y_hat)],
+    }
+
+def _screen_request(payload):
+    """
+    Validate an /api/screen body. Returns (patient, diseases, None), or
+    (None, None, (error body, HTTP status)); `diseases` has no duplicates.
+    """
+    if not isinstance(payload, dict):
+        return None, None, ({"error": "Request body must be a JSON object"}, 400)
+    patient = payload.get("patient", payload)
+    if not isinstance(patient, dict):
+        return None, None, ({"error": "patient must be an object"}, 400)
+    diseases = payload.get("diseases") if "patient" in payload else None
+    if diseases is None:
+        diseases = [d for d, cfg in disease_configs.items() if all(k in patient for k in cfg["PREDICTION_FEATURES"])]
+    elif not isinstance(diseases, list) or any(d not in disease_configs for d in diseases):
+        return None, None, ({"error": f"diseases must be a list drawn from {list(disease_configs)}"}, 400)
+    if not diseases:
+        return None, None, ({"error": "Payload doesn't contain the features of any supported disease"}, 400)
+    return patient, list(dict.fromkeys(diseases)), None
+
+def _screen_input(disease: str, patient: dict) -> tuple:
+    """(partial result, matrix) for screening `patient` for `disease`; matrix is None once the result holds an error."""
+    bundle = registry.get(disease)
+    if bundle is None:
+        return {"error": _failure_message("load", disease)}, None
+    matrix, errors = _parse_batch([patient], disease_configs[disease]["PREDICTION_FEATURES"])
+    if errors:
+        return {"model_version": bundle.version, "error": errors[0]["error"]}, None
+    return {"model_version": bundle.version}, matrix
+
+def _screen_done(out: dict, start: float) -> dict:
+    out["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return out
+
+def _screen_response(patient: dict, outs: dict, start: float) -> tuple:
+    """The records to store for the diseases screened without error and the /api/screen response body."""
+    results, timings, records = {}, {}, {}
+    for disease, out in outs.items():
+        timings[disease] = out.pop("elapsed_ms")
+        if "error" in out:
+            results[disease] = out
+            continue
+        y_hat = out.pop("y_hat")
+        record = records[disease] = _new_record(disease, patient, _risk_message(y_hat))
+        results[disease] = {"id": record["id"], "high_risk": bool(y_hat == 1),
+                            "Prediction": record["Prediction"], **out}
+    return records, {
+        "results": results,
+        "meta": {"timings_ms": timings, "total_ms": round((time.perf_counter() - start) * 1000, 3)},
+    }
+
+def _results_query(args):
+    """
+    The /results query string: disease, record id, view, whether the record is
+    `queued`, the history cursor and the page size clamped to
+    [1, RESULTS_MAX_PAGE_SIZE]. None for an unsupported disease.
+    """
+    disease = args.get("disease")
+    if disease not in disease_configs:
+        return None
+    return {
+        "disease": disease,
+        "id": args.get("id"),
+        "view": args.get("view", "all"),
+        "queued": args.get("queued") == "1",
+        # Newest first, one page at a time; `before` is the byte offset cursor
+        # handed out by the previous page.
+        "cursor": args.get("before", type=int),
+        "page_size": min(max(args.get("page_size", RESULTS_PAGE_SIZE, type=int), 1), RESULTS_MAX_PAGE_SIZE),
+    }
+
+def _results_page(query: dict, current, history: list, next_cursor) -> tuple:
+    """(template, context) of the /results page."""
+    disease = query["disease"]
+    return disease_configs[disease]["RESULTS_TEMPLATE"], {
+        "disease": disease,
+        "current_result": current,
+        "results": history,
+        "view_mode": query["view"],
+        "cursor": query["cursor"] if query["view"] != "current" else None,
+        "next_cursor": next_cursor,
+        "page_size": query["page_size"],
+    }
 
 def _load_records(disease: str) -> list:
     """Load stored records for the given disease."""
-    cfg = disease_configs[disease]
-    results_file = cfg["RESULTS_FILE"]
-    if not os.path.exists(results_file):
-        return []
-    with open(results_file, "r", encoding="utf-8") as fp:
-        return [json.loads(line) for line in fp if line.strip()]
+    return stores[disease].load_all()
 
 # ─────────────────────── Routes ───────────────────────
 @app.route("/")
@@ -101,59 +506,119 @@ def predict(disease):
     if disease not in disease_configs:
         return "Disease not supported", 404
 
-    cfg = disease_configs[disease]
+    bundle = registry.get(disease)
+    t0 = time.perf_counter()
+    f = request.form
+    t1 = time.perf_counter()
+    row, error = _form_row(disease, f)
+    if error:
+        template, context = _form_page(disease, error)
+        return render_template(template, **context)
+    _observe_stages(disease, bundle, parse=t1 - t0, frame=time.perf_counter() - t1)
+
+    if bundle is None:
+        template, context = _form_page(disease, _failure("load", disease)[0])
+        return render_template(template, **context)
+
     try:
-        f = request.form
-        input_dict = {k: float(f.get(k, 0)) for k in cfg["PREDICTION_FEATURES"]}
-        input_df = pd.DataFrame(input_dict, index=[0])
+        if coalescer is not None:
+            y_hat = _score_cached(disease, row, lambda d, m: [coalescer.predict(d, m)])[0]
+        else:
+            y_hat = _score_cached(disease, row)[0]
+        msg = _risk_message(y_hat)
     except Exception as e:
-        return render_template(cfg["INPUT_TEMPLATE"], prediction_text=f"❌ Error processing form: {e}", disease=disease)
-    
-    model, preprocessor = load_artifacts(disease)
-    if model is None or preprocessor is None:
-        return render_template(cfg["INPUT_TEMPLATE"], prediction_text=f"❌ Error loading {disease} model", disease=disease)
-    
+        msg = f"❌ {_failure('predict', disease, e)[0]}"
+
+    t3 = time.perf_counter()
+    record = _new_record(disease, f, msg)
+    _save_record(disease, record)
+    t4 = time.perf_counter()
+    response = redirect(url_for("results", **_current_result(disease, record)))
+    _observe_stages(disease, bundle, persist=t4 - t3, render=time.perf_counter() - t4)
+    return response
+
+@app.route("/api/predict/<disease>", methods=["POST"])
+def api_predict(disease):
+    """Score a JSON batch of patients with one vectorised transform/predict."""
+    if disease not in disease_configs:
+        return jsonify(error="Disease not supported"), 404
+
+    rows, matrix, error = _batch_payload(disease, request.get_json(silent=True))
+    if error:
+        body, status = error
+        return jsonify(body), status
+
+    bundle = registry.get(disease)
+    if bundle is None:
+        message, status = _failure("load", disease)
+        return jsonify(error=message), status
     try:
-        x_t = preprocessor.transform(input_df)
-        y_hat = model.predict(x_t)[0]
-        msg = ("🔴 High Risk – please consult a doctor."
-               if y_hat == 1 else
-               "🟢 Low Risk – stay healthy!")
+        y_hat = _score_cached(disease, matrix)
     except Exception as e:
-        msg = f"❌ Error during prediction: {e}"
-    
-    rec_id = str(uuid.uuid4())
-    record = {
-        "id": rec_id,
-        "ts": dt.datetime.now(dt.timezone.utc).isoformat(),
-        **{k: f.get(k, "") for k in cfg["PREDICTION_FEATURES"]},
-        "Prediction": msg
-    }
-    _save_record(disease, record)
-    return redirect(url_for("results", disease=disease, id=rec_id, view="current"))
+        message, status = _failure("predict", disease, e)
+        return jsonify(error=message), status
+
+    records, body = _batch_response(disease, bundle, rows, y_hat)
+    _save_records(disease, records)
+    return jsonify(body)
+
+@app.route("/api/screen", methods=["POST"])
+def api_screen():
+    """
+    Screen one patient for several diseases in one call. The body is either the
+    patient's features or {"patient": {...}, "diseases": [...]}; without an
+    explicit list every disease whose PREDICTION_FEATURES are all present is
+    screened. The models run concurrently on screen_pool.
+    """
+    start = time.perf_counter()
+    patient, diseases, error = _screen_request(request.get_json(silent=True))
+    if error:
+        body, status = error
+        return jsonify(body), status
+
+    futures = {d: screen_pool.submit(_screen_one, d, patient) for d in diseases}
+    records, body = _screen_response(patient, {d: fut.result() for d, fut in futures.items()}, start)
+    for disease, record in records.items():
+        _save_record(disease, record)
+    return jsonify(body)
+
+@app.route("/api/stats/<disease>")
+def api_stats(disease):
+    """Screening aggregates for a disease; the cost doesn't grow with its history."""
+    if disease not in disease_configs:
+        return jsonify(error="Disease not supported"), 404
+    stats[disease].refresh()
+    return jsonify(disease=disease, **stats[disease].snapshot())
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return app.response_class(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route("/results")
 def results():
-    disease = request.args.get("disease")
-    rec_id = request.args.get("id")
-    view = request.args.get("view", "all")
-    if disease not in disease_configs:
+    query = _results_query(request.args)
+    if query is None:
         return "Disease not supported", 404
 
-    all_recs = _load_records(disease)
-    current = next((r for r in all_recs if r["id"] == rec_id), None)
-    history = [r for r in all_recs if r["id"] != rec_id]
-    if view == "current":
-        history = []
-    
-    template = disease_configs[disease]["RESULTS_TEMPLATE"]
-    return render_template(
-        template,
-        disease=disease,
-        current_result=current,
-        results=history,
-        view_mode=view
-    )
+    disease, rec_id = query["disease"], query["id"]
+    current = _get_record(disease, rec_id, query["queued"])
+    history, next_cursor = [], None
+    if query["view"] != "current":
+        history, next_cursor = stores[disease].page(before=query["cursor"], limit=query["page_size"], exclude=rec_id)
+
+    template, context = _results_page(query, current, history, next_cursor)
+    return app.response_class(stream_template(template, **context))
+
+for _disease, _seconds in registry.load_times.items():
+    startup.record(f"  {_disease} model", _seconds)
+if os.getenv("STARTUP_REPORT", "1") == "1":
+    print(startup.report(), flush=True)
+
+@app.before_request
+def _first_request():
+    if startup.first_request is None and startup.mark_first_request():
+        print(f"⏱️  First request ({os.getpid()}) {startup.first_request:.2f}s after process start", flush=True)
 
 # ─────────────────────── Launch ───────────────────────
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+"""
+ASGI variant of app.py: the same routes, templates and `disease_configs`,
+served by Quart on an event loop.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8080
+
+Model state, the results stores, the write-behind writer, the prediction cache
+and the metrics are the ones app.py sets up, and the routes validate requests and
+build responses with app.py's request-handling helpers, only awaiting the I/O
+and inference in between. Blocking file I/O runs on a small
+I/O thread pool, and transform/predict run on a bounded inference pool, so a
+slow load, append or history page never holds up other requests.
+ASGI_INFERENCE_POOL=process moves inference into worker processes that load
+their own copies of the models.
+"""
+import asyncio, multiprocessing, os, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from quart import Quart, render_template, request, redirect, url_for, jsonify, stream_template
+
+import app as wsgi
+from app import disease_configs, registry, stores, stats, metrics, stage_seconds
+from healthapp.serving import inference_pool as inference_worker
+
+app = Quart(__name__)
+
+ASGI_INFERENCE_POOL = os.getenv("ASGI_INFERENCE_POOL", "thread")
+ASGI_INFERENCE_WORKERS = int(os.getenv("ASGI_INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+io_pool = ThreadPoolExecutor(max_workers=int(os.getenv("ASGI_IO_WORKERS", "8")), thread_name_prefix="asgi-io")
+
+
+# ─────────────────────── Inference pool ───────────────────────
+if ASGI_INFERENCE_POOL == "process":
+    # spawn, not fork: this process already runs the watcher and writer threads.
+    inference_pool = ProcessPoolExecutor(max_workers=ASGI_INFERENCE_WORKERS,
+                                         mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=inference_worker.init_worker, initargs=(disease_configs,))
+else:
+    inference_pool = ThreadPoolExecutor(max_workers=ASGI_INFERENCE_WORKERS, thread_name_prefix="asgi-inference")
+
+def _score_remote(disease: str, matrix: np.ndarray) -> np.ndarray:
+    bundle = registry.get(disease)
+    if bundle is None:
+        raise RuntimeError(f"Error loading {disease} model")
+    y_hat, timings = inference_pool.submit(inference_worker.score, disease, matrix, bundle.version).result()
+    # Observed here: the worker process's own metrics are never scraped.
+    for stage, seconds in timings.items():
+        stage_seconds.observe((stage, disease, bundle.version), seconds)
+    return y_hat
+
+async def _run(pool, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+async def _score(disease: str, matrix: np.ndarray) -> np.ndarray:
+    """wsgi._score_cached off the event loop, on whichever pool does the inference."""
+    if ASGI_INFERENCE_POOL == "process":
+        # Cache lookups stay in this process; only the misses cross to a worker.
+        return await _run(io_pool, wsgi._score_cached, disease, matrix, _score_remote)
+    return await _run(inference_pool, wsgi._score_cached, disease, matrix)
+
+
+# ─────────────────────── Routes ───────────────────────
+@app.route("/")
+async def home():
+    return await render_template("home.html", diseases=list(disease_configs.keys()))
+
+@app.route("/<disease>")
+async def disease_page(disease):
+    if disease not in disease_configs:
+        return "Disease not supported", 404
+    return await render_template(disease_configs[disease]["INPUT_TEMPLATE"], disease=disease)
+
+@app.route("/predict/<disease>", methods=["POST"])
+async def predict(disease):
+    if disease not in disease_configs:
+        return "Disease not supported", 404
+
+    bundle = registry.get(disease)
+    t0 = time.perf_counter()
+    f = await request.form
+    t1 = time.perf_counter()
+    row, error = wsgi._form_row(disease, f)
+    if error:
+        template, context = wsgi._form_page(disease, error)
+        return await render_template(template, **context)
+    wsgi._observe_stages(disease, bundle, parse=t1 - t0, frame=time.perf_counter() - t1)
+
+    if bundle is None:
+        template, context = wsgi._form_page(disease, wsgi._failure("load", disease)[0])
+        return await render_template(template, **context)
+
+    try:
+        msg = wsgi._risk_message((await _score(disease, row))[0])
+    except Exception as e:
+        msg = f"❌ {wsgi._failure('predict', disease, e)[0]}"
+
+    t3 = time.perf_counter()
+    record = wsgi._new_record(disease, f, msg)
+    await _run(io_pool, wsgi._save_record, disease, record)
+    t4 = time.perf_counter()
+    response = redirect(url_for("results", **wsgi._current_result(disease, record)))
+    wsgi._observe_stages(disease, bundle, persist=t4 - t3, render=time.perf_counter() - t4)
+    return response
+
+@app.route("/api/predict/<disease>", methods=["POST"])
+async def api_predict(disease):
+    """Score a JSON batch of patients with one vectorised transform/predict."""
+    if disease not in disease_configs:
+        return jsonify(error="Disease not supported"), 404
+
+    rows, matrix, error = wsgi._batch_payload(disease, await request.get_json(silent=True))
+    if error:
+        body, status = error
+        return jsonify(body), status
+
+    bundle = registry.get(disease)
+    if bundle is None:
+        message, status = wsgi._failure("load", disease)
+        return jsonify(error=message), status
+    try:
+        y_hat = await _score(disease, matrix)
+    except Exception as e:
+        message, status = wsgi._failure("predict", disease, e)
+        return jsonify(error=message), status
+
+    records, body = wsgi._batch_response(disease, bundle, rows, y_hat)
+    await _run(io_pool, wsgi._save_records, disease, records)
+    return jsonify(body)
+
+async def _screen_one(disease: str, patient: dict) -> dict:
+    start = time.perf_counter()
+    out, matrix = wsgi._screen_input(disease, patient)
+    if matrix is not None:
+        try:
+            out["y_hat"] = (await _score(disease, matrix))[0]
+        except Exception as e:
+            out["error"] = wsgi._failure_message("predict", disease, e)
+    return wsgi._screen_done(out, start)
+
+@app.route("/api/screen", methods=["POST"])
+async def api_screen():
+    """Same contract as app.api_screen; the diseases are scored concurrently on the inference pool."""
+    start = time.perf_counter()
+    patient, diseases, error = wsgi._screen_request(await request.get_json(silent=True))
+    if error:
+        body, status = error
+        return jsonify(body), status
+
+    outs = await asyncio.gather(*(_screen_one(d, patient) for d in diseases))
+    records, body = wsgi._screen_response(patient, dict(zip(diseases, outs)), start)
+    await asyncio.gather(*(_run(io_pool, wsgi._save_record, d, r) for d, r in records.items()))
+    return jsonify(body)
+
+@app.route("/api/stats/<disease>")
+async def api_stats(disease):
+    """Same contract as app.api_stats; catching up with the log runs on the I/O pool."""
+    if disease not in disease_configs:
+        return jsonify(error="Disease not supported"), 404
+    await _run(io_pool, stats[disease].refresh)
+    return jsonify(disease=disease, **stats[disease].snapshot())
+
+@app.route("/metrics")
+async def metrics_endpoint():
+    return metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+@app.route("/results")
+async def results():
+    query = wsgi._results_query(request.args)
+    if query is None:
+        return "Disease not supported", 404
+
+    disease, rec_id = query["disease"], query["id"]
+    current = await _run(io_pool, wsgi._get_record, disease, rec_id, query["queued"])
+    history, next_cursor = [], None
+    if query["view"] != "current":
+        history, next_cursor = await _run(io_pool, lambda: stores[disease].page(
+            before=query["cursor"], limit=query["page_size"], exclude=rec_id))
+
+    template, context = wsgi._results_page(query, current, history, next_cursor)
+    return await stream_template(template, **context)
+
+@app.before_request
+async def _first_request():
+    if wsgi.startup.first_request is None and wsgi.startup.mark_first_request():
+        print(f"⏱️  First request ({os.getpid()}) {wsgi.startup.first_request:.2f}s after process start", flush=True)
+
+@app.after_serving
+async def _shutdown():
+    inference_pool.shutdown(wait=False, cancel_futures=True)
+    io_pool.shutdown(wait=False)
+
+# ─────────────────────── Launch ───────────────────────
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8080")))
@@ -0,0 +1,305 @@
+"""
+Load test for the Flask app.
+
+Drives the home page, every disease's input form, POST /predict/<disease> and
+the /results history page with a fixed-seed mix of requests at the given
+concurrency, then reports throughput and p50/p95/p99 latency per route and
+disease. The app runs inside a scratch copy of the repo (models and templates
+symlinked, Results/ copied) so benchmark records never touch the real files.
+
+    python benchmarks/bench_app.py --target client --concurrency 8 --requests 100
+    python benchmarks/bench_app.py --target gunicorn --save benchmarks/baseline.json
+    python benchmarks/bench_app.py --target waitress --compare benchmarks/baseline.json --threshold 0.25
+    python benchmarks/bench_app.py --target gunicorn uvicorn --concurrency 32
+
+--target client uses Flask's test client in this process; waitress and gunicorn
+launch the WSGI app (app.py) and uvicorn the ASGI one (asgi.py) on a free local
+port. Several targets are run one after another and compared side by side. With --compare the run exits with
+status 1 if any route's latency percentile grew by more than --threshold
+(relative) and --min-delta-ms (absolute) over the baseline.
+"""
+import argparse, http.client, json, os, platform, random, shutil, socket, subprocess, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Left out of the scratch copy (Results/ is copied instead of linked).
+SKIP = {".git", "Results", "logs", "benchmarks"}
+
+
+# ─────────────── environment ───────────────
+def make_sandbox() -> str:
+    sandbox = tempfile.mkdtemp(prefix="bench_app_")
+    for name in os.listdir(ROOT):
+        if name not in SKIP:
+            os.symlink(os.path.join(ROOT, name), os.path.join(sandbox, name))
+    shutil.copytree(os.path.join(ROOT, "Results"), os.path.join(sandbox, "Results"))
+    return sandbox
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def disease_features(sandbox: str) -> dict:
+    """PREDICTION_FEATURES per disease, read without importing the app."""
+    import ast
+    with open(os.path.join(sandbox, "app.py"), encoding="utf-8") as fp:
+        tree = ast.parse(fp.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "disease_configs":
+            return {ast.literal_eval(d): ast.literal_eval(v)
+                    for d, cfg in zip(node.value.keys, node.value.values)
+                    for k, v in zip(cfg.keys, cfg.values) if ast.literal_eval(k) == "PREDICTION_FEATURES"}
+    raise RuntimeError("disease_configs not found in app.py")
+
+
+# ─────────────── clients ───────────────
+class ClientTarget:
+    """Flask test client in this process (one client per thread)."""
+
+    def __init__(self, sandbox: str, concurrency: int):
+        os.chdir(sandbox)
+        sys.path.insert(0, sandbox)
+        import app
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method: str, path: str, form=None) -> int:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.app.test_client()
+        resp = client.open(path, method=method, data=form)
+        resp.get_data()
+        resp.close()
+        return resp.status_code
+
+    def close(self) -> None:
+        self.app.writer.flush()
+
+
+class ServerTarget:
+    """A waitress or gunicorn subprocess, driven over keep-alive HTTP connections."""
+
+    def __init__(self, kind: str, sandbox: str, concurrency: int, startup_timeout: float = 180.0):
+        self.port = free_port()
+        if kind == "waitress":
+            cmd = [sys.executable, "-m", "waitress", f"--listen=127.0.0.1:{self.port}",
+                   f"--threads={concurrency}", "app:app"]
+        elif kind == "uvicorn":
+            cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(self.port),
+                   "--workers", os.getenv("WEB_CONCURRENCY", "4"), "--log-level", "warning"]
+        else:
+            cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                   "--bind", f"127.0.0.1:{self.port}", "app:app"]
+        self.log = open(os.path.join(sandbox, f"{kind}.log"), "wb")
+        self.proc = subprocess.Popen(cmd, cwd=sandbox, stdout=self.log, stderr=subprocess.STDOUT)
+        self._local = threading.local()
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            try:
+                if self.send("GET", "/") == 200:
+                    break
+            except OSError:
+                self._local.conn = None
+            if self.proc.poll() is not None or time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError(f"{kind} didn't come up; see {self.log.name}")
+            time.sleep(0.5)
+
+    def send(self, method: str, path: str, form=None) -> int:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        body, headers = None, {}
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+        if resp.getheader("Connection", "").lower() == "close":
+            conn.close()
+            self._local.conn = None
+        return resp.status
+
+    def close(self) -> None:
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.log.close()
+
+
+# ─────────────── workload ───────────────
+def build_jobs(features: dict, diseases: list, n: int, seed: int) -> list:
+    """n rounds of (route, disease, method, path, form) over every scenario, shuffled."""
+    rng = random.Random(seed)
+    jobs = []
+    for _ in range(n):
+        jobs.append(("GET /", "-", "GET", "/", None))
+        for d in diseases:
+            form = {k: round(rng.uniform(0, 100), 1) for k in features[d]}
+            jobs += [
+                ("GET /<disease>", d, "GET", f"/{d}", None),
+                ("POST /predict/<disease>", d, "POST", f"/predict/{d}", form),
+                ("GET /results", d, "GET", f"/results?disease={d}&view=all", None),
+            ]
+    rng.shuffle(jobs)
+    return jobs
+
+
+def run(target, jobs: list, concurrency: int):
+    samples, errors = {}, {}
+    lock = threading.Lock()
+
+    def one(job):
+        route, disease, method, path, form = job
+        start = time.perf_counter()
+        try:
+            ok = target.send(method, path, form) < 400
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            samples.setdefault((route, disease), []).append(elapsed)
+            if not ok:
+                errors[(route, disease)] = errors.get((route, disease), 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, jobs))
+    return samples, errors, time.perf_counter() - start
+
+
+def summarise(samples: dict, errors: dict, wall: float) -> dict:
+    def stats(values, n_errors):
+        ms = np.asarray(values) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        return {"count": len(values), "errors": n_errors, "rps": round(len(values) / wall, 2),
+                "mean_ms": round(float(ms.mean()), 3), "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+
+    routes = {f"{route} [{disease}]": stats(v, errors.get((route, disease), 0))
+              for (route, disease), v in sorted(samples.items())}
+    overall = stats([x for v in samples.values() for x in v], sum(errors.values()))
+    return {"overall": overall, "routes": routes}
+
+
+def print_report(report: dict) -> None:
+    print(f"{'route':<44}{'count':>7}{'err':>5}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, s in list(report["routes"].items()) + [("overall", report["overall"])]:
+        print(f"{name:<44}{s['count']:>7}{s['errors']:>5}{s['rps']:>9.1f}"
+              f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}")
+
+
+def compare(report: dict, baseline: dict, metric: str, threshold: float, min_delta_ms: float) -> list:
+    """Routes whose `metric` regressed past both thresholds, as printable lines."""
+    regressions = []
+    for name, s in report["routes"].items():
+        base = baseline["routes"].get(name)
+        if base is None:
+            continue
+        now, before = s[metric], base[metric]
+        if now > before * (1 + threshold) and now - before > min_delta_ms:
+            regressions.append(f"{name}: {metric} {before:.2f} → {now:.2f} ms (+{(now / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def bench(kind: str, args, diseases: list = None) -> dict:
+    """Run the warm-up and the measured rounds against one target and return its report."""
+    sandbox = make_sandbox()
+    features = disease_features(sandbox)
+    diseases = diseases or list(features)
+    target = None
+    try:
+        target = (ClientTarget(sandbox, args.concurrency) if kind == "client" else
+                  ServerTarget(kind, sandbox, args.concurrency))
+        if args.warmup:
+            run(target, build_jobs(features, diseases, args.warmup, args.seed + 1), args.concurrency)
+        samples, errors, wall = run(target, build_jobs(features, diseases, args.requests, args.seed), args.concurrency)
+    finally:
+        if target is not None:
+            target.close()
+        os.chdir(ROOT)
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+    report = summarise(samples, errors, wall)
+    report["meta"] = {"target": kind, "concurrency": args.concurrency, "requests": args.requests,
+                      "diseases": diseases, "seed": args.seed, "python": platform.python_version(),
+                      "machine": platform.machine(), "cpus": os.cpu_count(),
+                      "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return report
+
+
+def print_comparison(reports: list) -> None:
+    """p95 per route and overall throughput of several targets side by side."""
+    names = [r["meta"]["target"] for r in reports]
+    print(f"{'p95 ms':<44}" + "".join(f"{n:>12}" for n in names))
+    for route in reports[0]["routes"]:
+        print(f"{route:<44}" + "".join(f"{r['routes'].get(route, {}).get('p95_ms', float('nan')):>12.2f}" for r in reports))
+    print(f"{'overall rps':<44}" + "".join(f"{r['overall']['rps']:>12.1f}" for r in reports))
+    print(f"{'errors':<44}" + "".join(f"{r['overall']['errors']:>12}" for r in reports))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target", nargs="+", choices=["client", "waitress", "gunicorn", "uvicorn"], default=["client"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50, help="rounds over every route/disease scenario")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed rounds before measuring")
+    parser.add_argument("--diseases", nargs="+", help="default: every disease in app.disease_configs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="JSON", help="write the report as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="baseline to check for regressions")
+    parser.add_argument("--metric", choices=["p50_ms", "p95_ms", "p99_ms"], default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+    if len(args.target) > 1 and (args.save or args.compare):
+        parser.error("--save/--compare take a single --target")
+    if "client" in args.target and len(args.target) > 1:
+        parser.error("--target client can't be combined with server targets")
+    known = disease_features(ROOT)
+    unknown = set(args.diseases or []) - set(known)
+    if unknown:
+        parser.error(f"unknown diseases: {sorted(unknown)}")
+
+    reports = []
+    for kind in args.target:
+        report = bench(kind, args, args.diseases)
+        print(f"== {kind}")
+        print_report(report)
+        reports.append(report)
+    if len(reports) > 1:
+        print_comparison(reports)
+    report = reports[0]
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2)
+        print(f"Baseline written to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fp:
+            baseline = json.load(fp)
+        regressions = compare(report, baseline, args.metric, args.threshold, args.min_delta_ms)
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            return 1
+        print(f"✅ No route regressed past {args.threshold:.0%} on {args.metric}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Latency of the array-backed tree engine against sklearn's own predict.
+
+For every disease whose pickled model the engine covers, times
+`model.predict` and `TreeEnsemble.predict` on pre-processed training rows at
+each batch size, checks that the two agree exactly, and prints the median
+per call:
+
+    python benchmarks/bench_trees.py --batch 1 10 100 1000 --repeat 50
+"""
+import argparse, os, pickle, statistics, sys, time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+# Nothing is scored through the app; don't start the watcher or load models eagerly.
+os.environ.setdefault("MODEL_RELOAD_INTERVAL", "0")
+os.environ.setdefault("MODEL_LOAD_MODE", "lazy")
+
+
+def timed(fn, X, repeat: int) -> float:
+    fn(X)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--diseases", nargs="+", help="default: every disease with a tree model")
+    args = parser.parse_args(argv)
+
+    import app
+    from healthapp.inference.trees import TreeEnsemble
+    from healthapp.inference.bundle import reference_rows
+
+    print(f"{'disease':<10}{'model':<28}{'rows':>7}{'sklearn ms':>12}{'engine ms':>11}{'speed-up':>10}")
+    for disease in args.diseases or list(app.disease_configs):
+        cfg = app.disease_configs[disease]
+        if not (os.path.exists(cfg["MODEL_PATH"]) and os.path.exists(cfg["PREPROCESSOR_PATH"])):
+            continue
+        with open(cfg["MODEL_PATH"], "rb") as fp:
+            model = pickle.load(fp)
+        if not TreeEnsemble.supports(model):
+            continue
+        with open(cfg["PREPROCESSOR_PATH"], "rb") as fp:
+            preprocessor = pickle.load(fp)
+        bundle = app.registry.get(disease)
+        engine = bundle.engine if bundle is not None and bundle.engine is not None else TreeEnsemble.from_estimator(model)
+        if hasattr(model, "verbose"):
+            model.verbose = 0
+        rows = preprocessor.transform(np.asarray(reference_rows(preprocessor), dtype=np.float64))
+        for n in args.batch:
+            X = np.resize(rows, (n, rows.shape[1]))
+            if not engine.verify(model, X):
+                print(f"❌ {disease}: engine predictions differ from sklearn at {n} rows")
+                return 1
+            sk, eng = timed(model.predict, X, args.repeat), timed(engine.predict, X, args.repeat)
+            print(f"{disease:<10}{type(model).__name__:<28}{n:>7}{sk * 1000:>12.3f}{eng * 1000:>11.3f}{sk / eng:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
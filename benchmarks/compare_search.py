@@ -0,0 +1,104 @@
+"""
+How close the budgeted search strategies get to exhaustive search.
+
+For every disease with transformed data under `Artifacts/`, searches the
+trainers' SVC and Gradient Boosting grids exhaustively and with each
+strategy, then prints per strategy the fits and seconds spent, the winner,
+its cross-validated score under the exhaustive search (and its rank there),
+and the refit winner's test-set score:
+
+    python benchmarks/compare_search.py --diseases Cancer Heart --jobs 4
+    python benchmarks/compare_search.py --strategies halving random --random-fits 90
+"""
+import argparse, datetime as dt, os, sys, time, warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# The large grids of ModelTrainer.train_model (Cancer, Diabetes, Heart, Kidney) and the
+# resource each one is halved over.
+GRIDS = {
+    "SVC": {"C": [0.1, 1, 10, 100], "kernel": ["linear", "poly", "rbf", "sigmoid"],
+            "gamma": ["scale", "auto"], "degree": [2, 3, 4]},
+    "Gradient Boosting": {"learning_rate": [.1, .01, .05, .001], "subsample": [0.6, 0.7, 0.75, 0.85, 0.9],
+                          "n_estimators": [8, 16, 32, 64, 128, 256]},
+}
+HALVING = {"SVC": {"strategy": "halving", "resource": "n_samples"},
+           "Gradient Boosting": {"strategy": "halving", "resource": "n_estimators"}}
+
+
+def latest_arrays(disease: str):
+    """Train and test arrays of the disease's newest Artifacts/<timestamp>/ run, or None."""
+    root = os.path.join("healthapp", disease, "Artifacts")
+    runs = []
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        try:
+            runs.append((dt.datetime.strptime(name, "%m_%d_%Y_%H_%M_%S"), name))
+        except ValueError:
+            continue
+    for _, name in sorted(runs, reverse=True):
+        transformed = os.path.join(root, name, "data_transformation", "transformed")
+        if os.path.exists(os.path.join(transformed, "train.npy")):
+            return np.load(os.path.join(transformed, "train.npy")), np.load(os.path.join(transformed, "test.npy"))
+    return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--diseases", nargs="+", default=["Cancer", "Diabetes", "Heart", "Kidney", "Liver"])
+    parser.add_argument("--strategies", nargs="+", default=["halving", "random"], choices=["halving", "random"])
+    parser.add_argument("--random-fits", type=int, default=0,
+                        help="fit budget of the random search (default: a quarter of the exhaustive fits)")
+    parser.add_argument("--jobs", type=int, default=None, help="search workers (default: TRAIN_SEARCH_WORKERS)")
+    parser.add_argument("--scoring", default=None, help="default: TRAIN_SELECTION_METRIC")
+    args = parser.parse_args(argv)
+
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.metrics import check_scoring
+    from sklearn.svm import SVC
+    from healthapp.training.search import SELECTION_METRIC, grid_search
+    scoring = args.scoring or SELECTION_METRIC
+    warnings.filterwarnings("ignore")
+
+    def run(model: str, grid: dict, X, y):
+        start = time.perf_counter()
+        estimator = SVC() if model == "SVC" else GradientBoostingClassifier()
+        result = grid_search({model: estimator}, {model: grid}, X, y, cv=3, scoring=scoring, n_jobs=args.jobs)[model]
+        return result, time.perf_counter() - start
+
+    print(f"{'disease':<10}{'model':<19}{'strategy':<12}{'fits':>6}{'seconds':>9}{'cv':>8}{'rank':>6}"
+          f"{'gap':>8}{'test':>8}  best params")
+    worst_gap = 0.0
+    for disease in args.diseases:
+        arrays = latest_arrays(disease)
+        if arrays is None:
+            continue
+        (train, test) = arrays
+        X, y, X_test, y_test = train[:, :-1], train[:, -1], test[:, :-1], test[:, -1]
+        for model, grid in GRIDS.items():
+            exhaustive, seconds = run(model, grid, X, y)
+            cv_of = {repr(sorted(c.items())): s for c, s in zip(exhaustive.candidates, exhaustive.mean_scores)}
+            order = np.sort(exhaustive.mean_scores)[::-1]
+            strategies = {"exhaustive": grid}
+            for strategy in args.strategies:
+                spec = HALVING[model] if strategy == "halving" else \
+                    {"strategy": "random", "max_fits": args.random_fits or exhaustive.n_fits // 4}
+                strategies[strategy] = {**grid, "_search": spec}
+            for strategy, strategy_grid in strategies.items():
+                result, seconds = (exhaustive, seconds) if strategy == "exhaustive" else run(model, strategy_grid, X, y)
+                cv = cv_of[repr(sorted(result.best_params.items()))]
+                rank = int(np.searchsorted(-order, -cv, side="left")) + 1
+                gap = exhaustive.best_score - cv
+                worst_gap = max(worst_gap, gap)
+                test_score = check_scoring(result.best_estimator, scoring=scoring)(result.best_estimator, X_test, y_test)
+                print(f"{disease:<10}{model:<19}{strategy:<12}{result.n_fits:>6}{seconds:>9.2f}{cv:>8.4f}{rank:>6}"
+                      f"{gap:>8.4f}{test_score:>8.4f}  {result.best_params}")
+    print(f"\nLargest cross-validated {scoring} given up against exhaustive search: {worst_gap:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
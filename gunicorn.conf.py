@@ -0,0 +1,52 @@
+# Gunicorn settings: `gunicorn -c gunicorn.conf.py app:app`
+#
+# With PRELOAD_MODELS=1 (the default) every disease's artefacts are loaded once
+# in the master, sklearn tree models that a verified array engine replaces are
+# dropped, the remaining large numeric arrays (engine node tables, imputer
+# training rows) are moved into shared read-only memory and the heap is frozen
+# before the workers are forked, so the workers share one copy of the models
+# instead of holding four.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+preload_app = os.getenv("PRELOAD_MODELS", "1") == "1"
+
+# Arrays smaller than this stay where they are (they share pages with other objects anyway).
+SHARE_MIN_BYTES = int(os.getenv("PRELOAD_SHARE_MIN_BYTES", "4096"))
+
+if preload_app:
+    # Tells app.py not to start its background threads in the master.
+    os.environ["GUNICORN_PRELOAD"] = "1"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import app
+    from healthapp.serving.preload import freeze, report_memory, share_arrays
+
+    report_memory("master before sharing")
+    dropped = app.registry.drop_estimators()
+    if dropped:
+        server.log.info("Serving %s through the tree engine only", ", ".join(dropped))
+    moved = sum(share_arrays(app.registry.get(d), SHARE_MIN_BYTES) for d in app.disease_configs if app.registry.get(d))
+    freeze()
+    server.log.info("Preloaded models; %.1f MiB of arrays moved to shared memory", moved / 2 ** 20)
+    report_memory("master after sharing")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import app
+        app.start_background()
+
+
+def post_worker_init(worker):
+    from healthapp.serving.preload import report_memory
+    report_memory(f"worker {worker.pid}")
+
+
+def worker_exit(server, worker):
+    from healthapp.serving.preload import report_memory
+    report_memory(f"worker {worker.pid} at exit")
@@ -9,6 +9,7 @@ from healthapp.exception.exception import HealthAppException
 from healthapp.logging.logger import logging
 from healthapp.Cancer.entity.config_entity import DataTransformationConfig
 from healthapp.Cancer.utils.main_utils.utils import save_numpy_array_data, save_object
+from healthapp.inference.preprocessor import CompiledPreprocessor
 
 # The validated data now has exactly these columns.
 FEATURE_COLS = [
@@ -118,6 +119,14 @@ class DataTransformation:
             save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=test_array)
             save_object(self.data_transformation_config.transformed_object_file_path, transformer_obj)
             save_object("healthapp/Cancer/final_models/cancer_preprocessor.pkl", transformer_obj)
+
+            # Export the compiled preprocessor the web app uses, but only if it
+            # reproduces the sklearn pipeline bit-for-bit on the training data.
+            compiled_preprocessor = CompiledPreprocessor.from_pipeline(transformer_obj)
+            if compiled_preprocessor.verify(transformer_obj, X_train_df):
+                save_object("healthapp/Cancer/final_models/cancer_compiled_preprocessor.pkl", compiled_preprocessor)
+            else:
+                logging.warning("Compiled preprocessor does not match the sklearn pipeline; not exported.")
             logging.info("✅ Cancer preprocessor saved successfully!")
             
             artifact = DataTransformationArtifact(
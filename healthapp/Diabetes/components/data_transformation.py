@@ -11,6 +11,7 @@ from healthapp.exception.exception import HealthAppException
 from healthapp.logging.logger import logging
 from healthapp.Diabetes.entity.config_entity import DataTransformationConfig
 from healthapp.Diabetes.utils.main_utils.utils import save_numpy_array_data, save_object
+from healthapp.inference.preprocessor import CompiledPreprocessor
 
 class DataTransformation:
     def __init__(self, data_validation_artifact: DataValidationArtifact,
@@ -81,6 +82,14 @@ class DataTransformation:
 
             save_object("healthapp/Diabetes/final_models/diabetes_preprocessor.pkl", preprocessor_obj)
 
+            # Export the compiled preprocessor the web app uses, but only if it
+            # reproduces the sklearn pipeline bit-for-bit on the training data.
+            compiled_preprocessor = CompiledPreprocessor.from_pipeline(preprocessor_obj)
+            if compiled_preprocessor.verify(preprocessor_obj, input_feature_train_df):
+                save_object("healthapp/Diabetes/final_models/diabetes_compiled_preprocessor.pkl", compiled_preprocessor)
+            else:
+                logging.warning("Compiled preprocessor does not match the sklearn pipeline; not exported.")
+
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
                 transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
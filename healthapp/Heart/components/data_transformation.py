@@ -9,6 +9,7 @@ from healthapp.exception.exception import HealthAppException
 from healthapp.logging.logger import logging
 from healthapp.Heart.entity.config_entity import DataTransformationConfig
 from healthapp.Heart.utils.main_utils.utils import save_numpy_array_data, save_object
+from healthapp.inference.preprocessor import CompiledPreprocessor
 
 # Only these features will undergo transformation
 FEATURE_COLS = ['cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang']
@@ -102,6 +103,14 @@ class DataTransformation:
             save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_obj)
             save_object("healthapp/Heart/final_models/heart_preprocessor.pkl", preprocessor_obj)
 
+            # Export the compiled preprocessor the web app uses, but only if it
+            # reproduces the sklearn pipeline bit-for-bit on the training data.
+            compiled_preprocessor = CompiledPreprocessor.from_pipeline(preprocessor_obj)
+            if compiled_preprocessor.verify(preprocessor_obj, input_feature_train_df):
+                save_object("healthapp/Heart/final_models/heart_compiled_preprocessor.pkl", compiled_preprocessor)
+            else:
+                logging.warning("Compiled preprocessor does not match the sklearn pipeline; not exported.")
+
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
                 transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
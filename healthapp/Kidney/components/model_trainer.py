@@ -1,4 +1,5 @@
 import sys,os
+from dataclasses import asdict
 import mlflow.sklearn
 import numpy as np
 import pandas as pd
@@ -20,6 +21,8 @@ from healthapp.Kidney.utils.main_utils.utils import (
 from healthapp.Kidney.utils.ml_utils.metric.classification_metric import get_classification_score,precision_score,recall_score
 
 from healthapp.Kidney.utils.ml_utils.model.estimator import HealthModel
+from healthapp.inference.trees import TreeEnsemble
+from healthapp.inference.bundle import checksum,write_bundle
 
 from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
@@ -83,7 +86,9 @@ class ModelTrainer:
                 'subsample':[0.6,0.7,0.75,0.85,0.9],
                 # 'criterion':['squared_error', 'friedman_mse'],
                 # 'max_features':['auto','sqrt','log2'],
-                'n_estimators': [8,16,32,64,128,256]
+                'n_estimators': [8,16,32,64,128,256],
+                # 90 of the 360 fits pick the exhaustive search's CV score here (benchmarks/compare_search.py).
+                '_search':{'strategy':'random','max_fits':90}
             },
             "Logistic Regression":{},
             "AdaBoost":{
@@ -129,6 +134,27 @@ class ModelTrainer:
         print(best_model_name)
         logging.info(f"Best Model: {best_model_name}")
         
+        # Export the array-backed tree engine the web app uses, but only if it
+        # predicts exactly what the sklearn model does on the training data.
+        compiled_model_path="healthapp/Kidney/final_models/kidney_compiled_model.pkl"
+        compiled_model=TreeEnsemble.from_estimator(best_model) if TreeEnsemble.supports(best_model) else None
+        if compiled_model is not None and compiled_model.verify(best_model,X_train):
+            save_object(compiled_model_path,compiled_model)
+        else:
+            if os.path.exists(compiled_model_path):
+                os.remove(compiled_model_path)
+            logging.info(f"No compiled model exported for {best_model_name}; the app uses sklearn.")
+
+        # Export the memory-mappable bundle the web app loads first. The pickles
+        # above stay the source of truth, so a failed export only costs load time.
+        final_model_paths=["healthapp/Kidney/final_models/kidney_model.pkl","healthapp/Kidney/final_models/kidney_preprocessor.pkl"]
+        try:
+            write_bundle("healthapp/Kidney/final_models/kidney_bundle",disease="kidney",version=checksum(final_model_paths),
+                         model=best_model,preprocessor=preprocessor,
+                         metrics={"train":asdict(classification_train_metric),"test":asdict(classification_test_metric)})
+        except Exception as e:
+            logging.warning(f"No model bundle exported for {best_model_name}: {e}")
+        
         
         #model trainner artifact
         model_trainer_artifact=ModelTrainerArtifact(trained_model_file_path=self.model_trainer_config.trained_model_file_path,
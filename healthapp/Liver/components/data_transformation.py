@@ -13,6 +13,7 @@ from healthapp.exception.exception import HealthAppException
 from healthapp.logging.logger import logging
 from healthapp.Liver.entity.config_entity import DataTransformationConfig
 from healthapp.Liver.utils.main_utils.utils import save_numpy_array_data, save_object
+from healthapp.inference.preprocessor import CompiledPreprocessor
 
 # Define the feature columns for Liver data transformation.
 # These keys should match those used in your liver results template.
@@ -126,6 +127,14 @@ class DataTransformation:
             # Also save the preprocessor to the designated liver models folder.
             save_object("healthapp/Liver/final_models/liver_preprocessor.pkl", preprocessor_obj)
 
+            # Export the compiled preprocessor the web app uses, but only if it
+            # reproduces the sklearn pipeline bit-for-bit on the training data.
+            compiled_preprocessor = CompiledPreprocessor.from_pipeline(preprocessor_obj)
+            if compiled_preprocessor.verify(preprocessor_obj, input_feature_train_df):
+                save_object("healthapp/Liver/final_models/liver_compiled_preprocessor.pkl", compiled_preprocessor)
+            else:
+                logging.warning("Compiled preprocessor does not match the sklearn pipeline; not exported.")
+
             logging.info("Saved transformed training and testing data, and the preprocessor object.")
 
             data_transformation_artifact = DataTransformationArtifact(
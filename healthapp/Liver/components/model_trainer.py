@@ -1,4 +1,5 @@
 import sys, os
+from dataclasses import asdict
 import mlflow.sklearn
 import numpy as np
 import pandas as pd
@@ -18,6 +19,8 @@ from healthapp.Liver.utils.main_utils.utils import (
     evaluate_models
 )
 from healthapp.Liver.utils.ml_utils.metric.classification_metric import get_classification_score
+from healthapp.inference.trees import TreeEnsemble
+from healthapp.inference.bundle import checksum, write_bundle
 
 from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
@@ -96,6 +99,27 @@ class ModelTrainer:
         save_object("healthapp/Liver/final_models/liver_model.pkl", best_model)
         print(f"✅ Saved Liver Model: {best_model_name}")
 
+        # Export the array-backed tree engine the web app uses, but only if it
+        # predicts exactly what the sklearn model does on the training data.
+        compiled_model_path = "healthapp/Liver/final_models/liver_compiled_model.pkl"
+        compiled_model = TreeEnsemble.from_estimator(best_model) if TreeEnsemble.supports(best_model) else None
+        if compiled_model is not None and compiled_model.verify(best_model, X_train):
+            save_object(compiled_model_path, compiled_model)
+        else:
+            if os.path.exists(compiled_model_path):
+                os.remove(compiled_model_path)
+            logging.info(f"No compiled model exported for {best_model_name}; the app uses sklearn.")
+
+        # Export the memory-mappable bundle the web app loads first. The pickles
+        # above stay the source of truth, so a failed export only costs load time.
+        final_model_paths = ["healthapp/Liver/final_models/liver_model.pkl", "healthapp/Liver/final_models/liver_preprocessor.pkl"]
+        try:
+            write_bundle("healthapp/Liver/final_models/liver_bundle", disease="liver", version=checksum(final_model_paths),
+                         model=best_model, preprocessor=preprocessor,
+                         metrics={"train": asdict(classification_train_metric), "test": asdict(classification_test_metric)})
+        except Exception as e:
+            logging.warning(f"No model bundle exported for {best_model_name}: {e}")
+
         # Creating model trainer artifact
         model_trainer_artifact = ModelTrainerArtifact(
             trained_model_file_path=self.model_trainer_config.trained_model_file_path,
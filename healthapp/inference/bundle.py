@@ -0,0 +1,264 @@
+"""
+Versioned, memory-mappable model bundles.
+
+A bundle is a directory holding everything the web app needs to score one
+disease:
+
+    <disease>_bundle/
+        manifest.json   format version, model version, feature schema,
+                        training metrics and an index of the arrays
+        payload-<sha>.bin  the arrays themselves, raw and 64-byte aligned
+
+The pre-processor is stored as a CompiledPreprocessor's parameters and
+imputer training rows, and a tree model as a TreeEnsemble's node arrays and
+bitvector tables. Opening a bundle maps the payload read-only and wraps
+views of it, so loading costs about the same whatever the model's size,
+pages are only read when first touched, and every process serving the same
+file shares one copy through the page cache. Anything that can't be
+expressed as arrays (an SVC, a pipeline the compiler doesn't cover) is
+stored as a pickle inside the payload instead.
+
+Export bundles from the current final_models/ pickles with
+
+    python -m healthapp.inference.bundle                 # every disease
+    python -m healthapp.inference.bundle kidney liver --force
+"""
+import datetime as dt, hashlib, json, mmap, os, pickle, sys
+
+import numpy as np
+
+from healthapp.inference.preprocessor import CompiledPreprocessor, sklearn_transform
+from healthapp.inference.trees import TreeEnsemble
+
+FORMAT = "healthapp-model-bundle"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+ALIGN = 64
+
+
+def checksum(paths: list) -> str:
+    """Content hash of the files that exist among `paths`; doubles as the model version string."""
+    h = hashlib.sha256()
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, "rb") as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+class Bundle:
+    """An opened bundle: `preprocessor` and `model` are array-backed unless the manifest says pickle."""
+
+    def __init__(self, manifest: dict, preprocessor, model):
+        self.manifest = manifest
+        self.preprocessor = preprocessor
+        self.model = model
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    @property
+    def features(self) -> list:
+        return self.manifest["features"]
+
+    def transform(self, X):
+        return sklearn_transform(self.preprocessor, X)
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+# ─────────────── writing ───────────────
+def _pickled(obj) -> np.ndarray:
+    return np.frombuffer(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(data)
+    os.replace(tmp, path)
+
+
+def reference_rows(preprocessor):
+    """The pipeline imputer's stored training rows (raw, fit-time column order), or None."""
+    steps = getattr(preprocessor, "steps", None)
+    return getattr(steps[0][1], "_fit_X", None) if steps else None
+
+
+def write_bundle(path: str, *, disease: str, version: str, model, preprocessor, metrics: dict = None) -> dict:
+    """
+    Export a fitted model + pre-processor pipeline to the bundle directory
+    `path` and return its manifest. Each part goes in as arrays only if the
+    array-backed version reproduces sklearn exactly on the training rows;
+    otherwise it is pickled. The bundle is read back and checked before this
+    returns. The payload is written under a content-named file first and
+    the manifest replaced last, so readers switch versions atomically; old
+    payloads are then unlinked (processes that mapped them keep their pages).
+    """
+    rows = reference_rows(preprocessor)
+    rows = None if rows is None else np.asarray(rows, dtype=np.float64)
+    sections, arrays = {}, {}
+
+    try:
+        compiled = CompiledPreprocessor.from_pipeline(preprocessor)
+        if not compiled.verify(preprocessor):
+            raise ValueError("compiled pre-processor differs from the pipeline")
+        params, parts = compiled.to_arrays()
+        sections["preprocessor"] = {"kind": "compiled", "params": params}
+        arrays.update({f"preprocessor.{k}": v for k, v in parts.items()})
+    except (ValueError, AttributeError) as e:
+        sections["preprocessor"] = {"kind": "pickle", "reason": str(e)}
+        arrays["preprocessor.pickle"] = _pickled(preprocessor)
+
+    try:
+        engine = TreeEnsemble.from_estimator(model)
+        if rows is None or not engine.verify(model, sklearn_transform(preprocessor, rows)):
+            raise ValueError("tree engine differs from the model")
+        params, parts = engine.to_arrays()
+        sections["model"] = {"kind": "tree_ensemble", "params": params}
+        arrays.update({f"model.{k}": v for k, v in parts.items()})
+    except ValueError as e:
+        sections["model"] = {"kind": "pickle", "reason": str(e)}
+        arrays["model.pickle"] = _pickled(model)
+
+    index, chunks, offset = {}, [], 0
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        if a.dtype.hasobject:
+            raise ValueError(f"{name} holds Python objects and can't be stored as an array")
+        pad = -offset % ALIGN
+        chunks += [b"\0" * pad, a.tobytes()]
+        offset += pad
+        index[name] = {"offset": offset, "dtype": a.dtype.str, "shape": list(a.shape)}
+        offset += a.nbytes
+    payload = b"".join(chunks)
+
+    digest = hashlib.sha256(payload).hexdigest()
+    payload_file = f"payload-{digest[:16]}.bin"
+    features = getattr(preprocessor, "feature_names_in_", None)
+    manifest = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "disease": disease,
+        "version": version,
+        "created_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "model_class": type(model).__name__,
+        "features": [str(f) for f in features] if features is not None else None,
+        "metrics": metrics or {},
+        "preprocessor": sections["preprocessor"],
+        "model": sections["model"],
+        "payload": {"file": payload_file, "bytes": len(payload), "sha256": digest},
+        "arrays": index,
+    }
+    os.makedirs(path, exist_ok=True)
+    _write_atomic(os.path.join(path, payload_file), payload)
+    _write_atomic(os.path.join(path, MANIFEST), json.dumps(manifest, indent=2).encode())
+    for name in os.listdir(path):
+        if name.startswith("payload-") and name.endswith(".bin") and name != payload_file:
+            os.remove(os.path.join(path, name))
+
+    if rows is not None:
+        bundle = read_bundle(path)
+        X = rows[~np.isnan(rows).any(axis=1)]
+        if not np.array_equal(bundle.predict(bundle.transform(X)), model.predict(sklearn_transform(preprocessor, X))):
+            os.remove(os.path.join(path, MANIFEST))
+            raise ValueError(f"{path} doesn't reproduce the model's predictions; removed its manifest")
+    return manifest
+
+
+# ─────────────── reading ───────────────
+def read_manifest(path: str) -> dict:
+    with open(os.path.join(path, MANIFEST)) as fp:
+        manifest = json.load(fp)
+    if manifest.get("format") != FORMAT or manifest.get("format_version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{path} isn't a version {FORMAT_VERSION} {FORMAT}")
+    return manifest
+
+
+def read_bundle(path: str) -> Bundle:
+    """
+    Open a bundle. The payload is memory-mapped read-only and the arrays are
+    views of it; its size is checked against the manifest (a cheap guard
+    against a half-written bundle), its hash is not.
+    """
+    manifest = read_manifest(path)
+    with open(os.path.join(path, manifest["payload"]["file"]), "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size != manifest["payload"]["bytes"]:
+            raise ValueError(f"{path} payload is {size} bytes, the manifest expects {manifest['payload']['bytes']}")
+        buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def section(prefix: str) -> dict:
+        out = {}
+        for name, spec in manifest["arrays"].items():
+            if name.startswith(prefix):
+                dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+                count = int(np.prod(shape, dtype=np.int64))
+                a = np.frombuffer(buf, dtype=dtype, count=count, offset=spec["offset"]) if count else np.empty(0, dtype)
+                out[name[len(prefix):]] = a.reshape(shape)
+        return out
+
+    pre, mod = manifest["preprocessor"], manifest["model"]
+    if pre["kind"] == "compiled":
+        preprocessor = CompiledPreprocessor.from_arrays(pre["params"], section("preprocessor."))
+    else:
+        preprocessor = pickle.loads(section("preprocessor.")["pickle"])
+    if mod["kind"] == "tree_ensemble":
+        model = TreeEnsemble.from_arrays(mod["params"], section("model."))
+    else:
+        model = pickle.loads(section("model.")["pickle"])
+    return Bundle(manifest, preprocessor, model)
+
+
+# ─────────────── export CLI ───────────────
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Export final_models/ pickles to memory-mappable bundles.")
+    parser.add_argument("diseases", nargs="*", help="default: every disease under --root with both pickles")
+    parser.add_argument("--root", default="healthapp")
+    parser.add_argument("--force", action="store_true", help="re-export bundles that are already up to date")
+    args = parser.parse_args(argv)
+
+    names = {d.lower(): d for d in os.listdir(args.root) if os.path.isdir(os.path.join(args.root, d, "final_models"))}
+    diseases = args.diseases or sorted(names)
+    unknown = [d for d in diseases if d.lower() not in names]
+    if unknown:
+        parser.error(f"unknown diseases: {unknown}")
+
+    status = 0
+    for disease in (d.lower() for d in diseases):
+        final = os.path.join(args.root, names[disease], "final_models")
+        sources = [os.path.join(final, f"{disease}_model.pkl"), os.path.join(final, f"{disease}_preprocessor.pkl")]
+        out = os.path.join(final, f"{disease}_bundle")
+        if not all(os.path.exists(p) for p in sources):
+            print(f"⏭️  {disease}: no model/pre-processor pickles")
+            continue
+        version = checksum(sources)
+        try:
+            if not args.force and read_manifest(out)["version"] == version:
+                print(f"✅ {disease}: bundle {version} is up to date")
+                continue
+        except (OSError, ValueError):
+            pass
+        try:
+            with open(sources[0], "rb") as fp:
+                model = pickle.load(fp)
+            with open(sources[1], "rb") as fp:
+                preprocessor = pickle.load(fp)
+            manifest = write_bundle(out, disease=disease, version=version, model=model, preprocessor=preprocessor)
+        except Exception as e:
+            print(f"❌ {disease}: {e}")
+            status = 1
+            continue
+        print(f"✅ {disease}: bundle {version} ({manifest['model_class']}; pre-processor "
+              f"{manifest['preprocessor']['kind']}, model {manifest['model']['kind']}, "
+              f"{manifest['payload']['bytes'] / 2 ** 20:.1f} MiB)")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Squared distances closer than this (relative to the rows' squared norms) count as tied:
+# well above the rounding of sklearn's |x|^2 - 2x.y + |y|^2 and of the tree's distances.
+TIE_RTOL = 1e-9
+
+
+class IndexedKNNImputer:
+    """
+    Inference-time KNN imputation over a fitted `KNNImputer`'s training rows.
+
+    sklearn's KNNImputer computes nan-euclidean distances from every row with
+    missing values to every stored training row on each call. Here, training
+    rows without NaNs (normally all of them) are indexed with one KD-tree per
+    missingness pattern of the query. For a row observed on features O, the
+    nan-euclidean distance to a complete training row is
+    sqrt(n_features / |O|) times the plain euclidean distance on O, so the
+    k nearest rows in that subspace are exactly the k nearest donors. Trees
+    for the `prebuild` most frequent missingness patterns of the training rows
+    (the ones requests are most likely to show) are built up front, when the
+    imputer is created or unpickled; any other pattern's tree is built on
+    first use. All are kept in a small LRU cache shared by all requests. The few training rows that themselves have NaNs are still
+    scored by brute force, since their distance depends on which coordinates
+    they share with the query.
+
+    Which of several equidistant donors make the k nearest is decided by how
+    sklearn's own distances and partial sort happen to round, so rows whose
+    k-th and (k+1)-th donors are tied (within float error) are handed to a
+    plain KNNImputer over the same training rows instead. With uniform weights
+    (what the pipelines use) the result then equals sklearn's bit for bit;
+    with weights="distance" the 1/d weights can still differ in the last bits.
+    """
+
+    def __init__(self, fit_X: np.ndarray, n_neighbors: int = 5, weights: str = "uniform", max_trees: int = 64,
+                 prebuild: int = 16):
+        if weights not in ("uniform", "distance"):
+            raise ValueError(f"Unsupported KNN weights: {weights}")
+        self.fit_X = np.ascontiguousarray(fit_X, dtype=np.float64)
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.max_trees = max_trees
+        self.prebuild = min(prebuild, max_trees)
+        mask = np.isnan(self.fit_X)
+        self.fit_mask = mask
+        complete = ~mask.any(axis=1)
+        self.complete_X = np.ascontiguousarray(self.fit_X[complete])
+        self.partial_idx = np.flatnonzero(~complete)
+        self.col_means = np.ma.array(self.fit_X, mask=mask).mean(axis=0).filled(np.nan)
+        self.max_norm2 = float((np.nan_to_num(self.fit_X) ** 2).sum(axis=1).max(initial=0.0))
+        self._init_cache()
+
+    def _init_cache(self) -> None:
+        self._trees = OrderedDict()
+        self._lock = threading.Lock()
+        self._reference = None
+        self._prebuild()
+
+    def _prebuild(self) -> None:
+        """Build the trees of the training rows' most frequent missingness patterns, least frequent first."""
+        if not self.prebuild or not len(self.partial_idx) or not len(self.complete_X):
+            return
+        observed = ~self.fit_mask[self.partial_idx]
+        observed = observed[observed.any(axis=1)]
+        if not len(observed):
+            return
+        patterns, counts = np.unique(observed, axis=0, return_counts=True)
+        for i in np.argsort(counts, kind="stable")[::-1][:self.prebuild][::-1]:
+            self._tree(patterns[i])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_trees", None)
+        state.pop("_lock", None)
+        state.pop("_reference", None)
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault("prebuild", 0)  # pickled before trees were prebuilt
+        self.__dict__.update(state)
+        self._init_cache()
+
+    @classmethod
+    def from_fitted(cls, imputer) -> "IndexedKNNImputer":
+        if imputer.metric != "nan_euclidean" or not np.isnan(imputer.missing_values):
+            raise ValueError("Only nan_euclidean KNNImputer with NaN missing values is supported")
+        return cls(imputer._fit_X, n_neighbors=imputer.n_neighbors, weights=imputer.weights)
+
+    def _tree(self, observed: np.ndarray):
+        """cKDTree over the complete training rows restricted to `observed` columns."""
+        from scipy.spatial import cKDTree  # only needed for training rows or queries with NaNs
+        key = observed.tobytes()
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self._trees.move_to_end(key)
+                return tree
+        tree = cKDTree(self.complete_X[:, observed])
+        with self._lock:
+            self._trees[key] = tree
+            while len(self._trees) > self.max_trees:
+                self._trees.popitem(last=False)
+        return tree
+
+    def _reference_imputer(self):
+        """sklearn's KNNImputer fitted on the same rows, for the rows with tied donors."""
+        from sklearn.impute import KNNImputer  # only needed once a tie shows up
+        with self._lock:
+            if self._reference is None:
+                self._reference = KNNImputer(n_neighbors=self.n_neighbors, weights=self.weights).fit(self.fit_X)
+            return self._reference
+
+    def _partial_distances(self, Q: np.ndarray, observed: np.ndarray) -> np.ndarray:
+        """nan-euclidean distances from query rows Q to the training rows that have NaNs."""
+        P = self.fit_X[self.partial_idx]
+        common = observed & ~self.fit_mask[self.partial_idx]          # (n_partial, n_features)
+        diff = np.where(common[None, :, :], Q[:, None, :] - np.nan_to_num(P)[None, :, :], 0.0)
+        n_common = common.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d = np.sqrt(self.fit_X.shape[1] / n_common * (diff ** 2).sum(axis=2))
+        d[:, n_common == 0] = np.nan
+        return d
+
+    @staticmethod
+    def _distance_average(values: np.ndarray, dist: np.ndarray) -> np.ndarray:
+        """weights='distance': 1/d, except exact matches take all the weight (as in sklearn)."""
+        with np.errstate(divide="ignore"):
+            w = 1.0 / dist
+        inf = np.isinf(w)
+        inf_row = inf.any(axis=1)
+        w[inf_row] = inf[inf_row]
+        return (values * w).sum(axis=1) / w.sum(axis=1)
+
+    def _impute_pattern(self, X: np.ndarray, missing: np.ndarray) -> None:
+        """Fill rows of X that all share the missingness pattern `missing`."""
+        observed = ~missing
+        n_obs = int(observed.sum())
+        if n_obs == 0:
+            X[:, missing] = self.col_means[missing]
+            return
+        Q = X[:, observed]
+        k = self.n_neighbors
+        scale = np.sqrt(X.shape[1] / n_obs)
+        cand_d, cand_i = np.empty((len(X), 0)), np.empty((len(X), 0), dtype=np.intp)
+        if len(self.complete_X):
+            # One spare candidate to tell whether the k-th donor is tied with the next one.
+            kk = min(k + 1, len(self.complete_X))
+            cand_d, cand_i = self._tree(observed).query(Q, k=kk)
+            cand_d = np.asarray(cand_d, dtype=np.float64).reshape(len(X), kk) * scale
+            cand_i = np.asarray(cand_i).reshape(len(X), kk)
+        complete_vals = self.complete_X
+        partial_d = self._partial_distances(X, observed) if len(self.partial_idx) else None
+        tie_tol = TIE_RTOL * scale ** 2 * ((Q ** 2).sum(axis=1) + self.max_norm2)
+        tied = np.zeros(len(X), dtype=bool)
+        for col in np.flatnonzero(missing):
+            values = complete_vals[cand_i, col] if cand_i.size else np.empty((len(X), 0))
+            dist = cand_d
+            if partial_d is not None:
+                donors = ~self.fit_mask[self.partial_idx, col]
+                if donors.any():
+                    values = np.hstack([values, np.broadcast_to(self.fit_X[self.partial_idx[donors], col], (len(X), donors.sum()))])
+                    dist = np.hstack([dist, partial_d[:, donors]])
+            # NaN distances (no shared coordinates) sort last and carry no weight.
+            dist = np.where(np.isnan(dist), np.inf, dist)
+            order = np.argsort(dist, axis=1, kind="stable")
+            rows = np.arange(len(X))[:, None]
+            if order.shape[1] > k:
+                kth, after = dist[rows[:, 0], order[:, k - 1]], dist[rows[:, 0], order[:, k]]
+                tied |= np.isfinite(after) & (after ** 2 - kth ** 2 <= tie_tol)
+            order = order[:, :k]
+            top_d, top_v = dist[rows, order], values[rows, order]
+            finite = np.isfinite(top_d)
+            out = np.full(len(X), self.col_means[col])
+            has = finite.any(axis=1)
+            if has.any():
+                # Rows with fewer than k usable donors average only the finite ones.
+                v = np.where(finite, top_v, 0.0)[has]
+                d = np.where(finite, top_d, np.inf)[has]
+                if self.weights == "uniform":
+                    out[has] = v.sum(axis=1) / finite[has].sum(axis=1)
+                else:
+                    out[has] = self._distance_average(v, d)
+            X[:, col] = out
+        if tied.any():
+            original = X[tied]
+            original[:, missing] = np.nan
+            X[tied] = self._reference_imputer().transform(original)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Impute NaNs in X (modified in place and returned)."""
+        mask = np.isnan(X)
+        rows = np.flatnonzero(mask.any(axis=1))
+        if not rows.size:
+            return X
+        patterns, inverse = np.unique(mask[rows], axis=0, return_inverse=True)
+        for p, missing in enumerate(patterns):
+            sel = rows[inverse.ravel() == p]
+            block = X[sel]
+            self._impute_pattern(block, missing)
+            X[sel] = block
+        return X
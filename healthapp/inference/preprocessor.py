@@ -0,0 +1,141 @@
+import warnings
+
+import numpy as np
+
+from healthapp.inference.imputer import IndexedKNNImputer
+
+
+def sklearn_transform(transformer, X):
+    """
+    `transformer.transform(X)` on a plain array already in `feature_names_in_`
+    order, without sklearn's warning on every call that it has no column names.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+        return transformer.transform(X)
+
+
+class CompiledPreprocessor:
+    """
+    Inference-time replacement for the training pipeline
+    `Pipeline([KNNImputer, StandardScaler, MinMaxScaler])`.
+
+    The two scalers run as in-place numpy ops on one contiguous float64 buffer,
+    with no per-step input validation and no DataFrame, and imputation only
+    runs on rows that actually contain NaNs, through an IndexedKNNImputer when
+    the fitted imputer allows it. The scaler ops are applied in the same order sklearn uses, so
+    complete rows come out bit-for-bit identical to `pipeline.transform`;
+    `verify()` checks exactly that.
+    """
+
+    def __init__(self, feature_names: list, imputer, mean, scale, mm_scale, mm_min, clip=None, knn=None):
+        self.feature_names = list(feature_names)
+        self.imputer = imputer
+        self.knn = knn
+        self.mean = mean
+        self.scale = scale
+        self.mm_scale = mm_scale
+        self.mm_min = mm_min
+        self.clip = clip
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "CompiledPreprocessor":
+        """Extract the fitted parameters; raises ValueError for any other pipeline shape."""
+        steps = [type(step).__name__ for _, step in getattr(pipeline, "steps", [])]
+        if steps != ["KNNImputer", "StandardScaler", "MinMaxScaler"]:
+            raise ValueError(f"Unsupported preprocessing pipeline: {steps}")
+        imputer, scaler, normalizer = (step for _, step in pipeline.steps)
+        if imputer.add_indicator or not np.all(imputer._valid_mask) or not np.isnan(imputer.missing_values):
+            raise ValueError("Unsupported KNNImputer configuration")
+        feature_names = getattr(pipeline, "feature_names_in_", None)
+        if feature_names is None:
+            feature_names = [f"x{i}" for i in range(imputer.n_features_in_)]
+        try:
+            knn = IndexedKNNImputer.from_fitted(imputer)
+        except ValueError:
+            knn = None
+        return cls(
+            feature_names=feature_names,
+            imputer=imputer,
+            mean=scaler.mean_ if scaler.with_mean else None,
+            scale=scaler.scale_ if scaler.with_std else None,
+            mm_scale=normalizer.scale_,
+            mm_min=normalizer.min_,
+            clip=normalizer.feature_range if normalizer.clip else None,
+            knn=knn,
+        )
+
+    def to_arrays(self):
+        """(params, arrays) for healthapp.inference.bundle; needs the KD-tree imputer."""
+        if self.knn is None:
+            raise ValueError("Only an IndexedKNNImputer-backed pre-processor can be stored as arrays")
+        params = {"feature_names": self.feature_names, "n_neighbors": self.knn.n_neighbors,
+                  "weights": self.knn.weights, "clip": None if self.clip is None else [float(c) for c in self.clip]}
+        arrays = {"fit_X": self.knn.fit_X, "mm_scale": self.mm_scale, "mm_min": self.mm_min}
+        if self.mean is not None:
+            arrays["mean"] = self.mean
+        if self.scale is not None:
+            arrays["scale"] = self.scale
+        return params, arrays
+
+    @classmethod
+    def from_arrays(cls, params: dict, arrays: dict) -> "CompiledPreprocessor":
+        """Inverse of `to_arrays`; the arrays are used as given (e.g. read-only memory maps)."""
+        knn = IndexedKNNImputer(arrays["fit_X"], n_neighbors=params["n_neighbors"], weights=params["weights"])
+        return cls(
+            feature_names=params["feature_names"],
+            imputer=None,
+            mean=arrays.get("mean"),
+            scale=arrays.get("scale"),
+            mm_scale=arrays["mm_scale"],
+            mm_min=arrays["mm_min"],
+            clip=None if params["clip"] is None else tuple(params["clip"]),
+            knn=knn,
+        )
+
+    def _impute(self, X: np.ndarray) -> np.ndarray:
+        missing = np.isnan(X).any(axis=1)
+        if missing.any():
+            if self.knn is not None:
+                return self.knn.transform(X)
+            X[missing] = sklearn_transform(self.imputer, X[missing])
+        return X
+
+    def transform(self, X, columns=None) -> np.ndarray:
+        """
+        (n_rows, n_features) input → model-ready float64 array. The input is in
+        `feature_names` order, or `columns` gives, for each of those names, the
+        input column that holds it.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2-D array, got shape {X.shape}")
+        X = np.ascontiguousarray(X[:, columns]) if columns is not None else X.copy(order="C")
+        if X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got shape {X.shape}")
+        if np.isinf(X).any():
+            raise ValueError("Input contains infinity")
+        X = self._impute(X)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        X *= self.mm_scale
+        X += self.mm_min
+        if self.clip is not None:
+            np.clip(X, self.clip[0], self.clip[1], out=X)
+        return X
+
+    def verify(self, pipeline, X=None) -> bool:
+        """
+        True when `transform` matches `pipeline.transform` exactly on the
+        complete rows of X (default: the imputer's stored training rows).
+        Rows with NaNs are left out: with weights="distance" their imputed values
+        can differ in the last bits (see IndexedKNNImputer).
+        """
+        if X is None:
+            X = self.imputer._fit_X if self.imputer is not None else self.knn.fit_X
+        X = np.asarray(X, dtype=np.float64)
+        X = X[~np.isnan(X).any(axis=1)]
+        expected = sklearn_transform(pipeline, X)
+        return bool(np.array_equal(self.transform(X), expected, equal_nan=True))
@@ -0,0 +1,313 @@
+import numpy as np
+
+# Above this size the per-feature bitvector tables aren't built and every
+# prediction walks the node arrays instead.
+BITVECTOR_MAX_BYTES = 64 * 1024 * 1024
+# Rows scored per block on the bitvector path; keeps the gathered masks in cache.
+BLOCK_ROWS = 512
+# Past this many rows per call sklearn's compiled per-tree loops overtake the
+# numpy passes on deep forests; ModelBundle.predict hands bigger batches to sklearn.
+MAX_ROWS = 4096
+
+SUPPORTED = ("DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier",
+             "GradientBoostingClassifier", "AdaBoostClassifier")
+
+
+def _sum_in_order(parts: np.ndarray) -> np.ndarray:
+    """parts[0] + parts[1] + ... strictly left to right, as sklearn accumulates trees (np.sum may pair them)."""
+    if parts.shape[1] < 128:
+        return np.cumsum(parts, axis=0)[-1]
+    out = parts[0].copy()
+    for part in parts[1:]:
+        out += part
+    return out
+
+
+class TreeEnsemble:
+    """
+    Array-backed replacement for a fitted sklearn tree model's `predict`.
+
+    Supports DecisionTreeClassifier, RandomForestClassifier /
+    ExtraTreesClassifier, GradientBoostingClassifier and AdaBoostClassifier
+    over decision trees. Every tree is flattened into one set of contiguous
+    node arrays (feature, threshold, children, leaf values), so a prediction
+    costs a handful of numpy calls instead of a Python/joblib round trip per
+    tree.
+
+    Leaves are found with per-feature bitvector tables (QuickScorer style):
+    every leaf of a tree is a bit, in left-to-right order, and every split
+    node is a mask clearing the leaves of its left subtree. A row goes right
+    at exactly the nodes whose threshold is below its feature value, which
+    for each feature is a prefix of that feature's nodes sorted by
+    threshold, so ANDing one precomputed prefix mask per feature leaves the
+    exit leaf as the lowest set bit of every tree. Rows with NaNs, and
+    ensembles whose tables would exceed BITVECTOR_MAX_BYTES, walk the node
+    arrays level by level instead.
+
+    Results are bit-for-bit sklearn's: inputs are rounded to float32 before
+    the threshold comparisons as sklearn's tree code does, and per-tree
+    outputs are accumulated one tree at a time in estimator order with the
+    estimator's own scaling and normalisation. `verify()` checks exactly that.
+    """
+
+    def __init__(self, kind: str, classes, feature, threshold, left, right, missing_left, value, roots,
+                 max_depth: int, n_features: int, **params):
+        self.kind = kind
+        self.classes_ = classes
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+        self.params = params
+        self._build_bitvectors()
+
+    # The tables are derived data, often much larger than the trees: rebuilt on load.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_bitvectors", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_bitvectors()
+
+    # ─────────────── export ───────────────
+    @staticmethod
+    def _flatten(trees: list, n_values: int):
+        """Concatenate sklearn Tree objects; leaves point at themselves."""
+        feature, threshold, left, right, missing_left, value, roots = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for tree in trees:
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n, dtype=np.intp)
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+            mgl = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(n, dtype=bool) if mgl is None else np.asarray(mgl, dtype=bool))
+            value.append(tree.value[:, 0, :n_values])
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+        cat = lambda parts, dtype: np.ascontiguousarray(np.concatenate(parts), dtype=dtype)
+        return dict(feature=cat(feature, np.intp), threshold=cat(threshold, np.float64), left=cat(left, np.intp),
+                    right=cat(right, np.intp), missing_left=cat(missing_left, bool), value=cat(value, np.float64),
+                    roots=np.asarray(roots, dtype=np.intp), max_depth=max_depth)
+
+    @staticmethod
+    def supports(est) -> bool:
+        return type(est).__name__ in SUPPORTED
+
+    @classmethod
+    def from_estimator(cls, est) -> "TreeEnsemble":
+        """Flatten a fitted estimator; raises ValueError for anything unsupported."""
+        name = type(est).__name__
+        if getattr(est, "n_outputs_", 1) != 1:
+            raise ValueError(f"Multi-output {name} is not supported")
+        n_features = est.n_features_in_
+        classes = np.asarray(est.classes_)
+        if name == "DecisionTreeClassifier":
+            return cls("tree", classes, n_features=n_features, **cls._flatten([est.tree_], len(classes)))
+        if name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+            return cls("forest", classes, n_features=n_features,
+                       **cls._flatten([e.tree_ for e in est.estimators_], len(classes)))
+        if name == "GradientBoostingClassifier":
+            init = est.init_
+            if not (init == "zero" or type(init).__name__ == "DummyClassifier"):
+                raise ValueError("Only the default (prior) or zero init estimator is supported")
+            # The init estimator predicts a constant, so its raw scores are stored once.
+            init_raw = est._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+            n_stages, K = est.estimators_.shape
+            return cls("gb", classes, n_features=n_features, init_raw=init_raw, scale=float(est.learning_rate),
+                       n_stages=n_stages, K=K, **cls._flatten([e.tree_ for e in est.estimators_.ravel()], 1))
+        if name == "AdaBoostClassifier":
+            if getattr(est, "algorithm", "SAMME") not in ("SAMME", "deprecated"):
+                raise ValueError(f"AdaBoost algorithm {est.algorithm} is not supported")
+            for e in est.estimators_:
+                if type(e).__name__ != "DecisionTreeClassifier" or not np.array_equal(e.classes_, classes):
+                    raise ValueError("AdaBoost over non-tree estimators is not supported")
+            weights = np.asarray(est.estimator_weights_, dtype=np.float64)
+            return cls("adaboost", classes, n_features=n_features,
+                       weights=weights[:len(est.estimators_)].copy(), weight_sum=weights.sum(),
+                       **cls._flatten([e.tree_ for e in est.estimators_], len(classes)))
+        raise ValueError(f"No array-backed engine for {name}")
+
+    _NODE_ARRAYS = ("classes_", "feature", "threshold", "left", "right", "missing_left", "value", "roots")
+
+    def to_arrays(self):
+        """(params, arrays) for healthapp.inference.bundle, bitvector tables included."""
+        params = {"kind": self.kind, "max_depth": int(self.max_depth), "n_features": int(self.n_features_in_),
+                  "params": {}, "bitvector_words": None}
+        arrays = {name: getattr(self, name) for name in self._NODE_ARRAYS}
+        for key, value in self.params.items():
+            if isinstance(value, np.ndarray):
+                arrays[f"param.{key}"] = value
+            else:
+                params["params"][key] = value.item() if isinstance(value, np.generic) else value
+        if self._bitvectors is not None:
+            bv = self._bitvectors
+            params["bitvector_words"] = bv["words"]
+            arrays["bv.table"] = bv["table"]
+            arrays["bv.leaf_node"] = bv["leaf_node"]
+            arrays["bv.offsets"] = bv["offsets"]
+            arrays["bv.thresholds"] = np.concatenate(bv["thresholds"])
+        return params, arrays
+
+    @classmethod
+    def from_arrays(cls, params: dict, arrays: dict) -> "TreeEnsemble":
+        """Inverse of `to_arrays`; nothing is copied or rebuilt, so memory-mapped arrays stay mapped."""
+        self = cls.__new__(cls)
+        for name in cls._NODE_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.kind = params["kind"]
+        self.max_depth = params["max_depth"]
+        self.n_features_in_ = params["n_features"]
+        self.params = dict(params["params"])
+        self.params.update({k[len("param."):]: v for k, v in arrays.items() if k.startswith("param.")})
+        if params["bitvector_words"] is None:
+            self._bitvectors = None
+        else:
+            # thresholds of feature f sit between offsets[f] - f and offsets[f + 1] - (f + 1).
+            starts = arrays["bv.offsets"] - np.arange(self.n_features_in_)
+            thresholds = np.split(arrays["bv.thresholds"], starts[1:])
+            self._bitvectors = dict(thresholds=thresholds, offsets=arrays["bv.offsets"], table=arrays["bv.table"],
+                                    leaf_node=arrays["bv.leaf_node"], words=params["bitvector_words"])
+        return self
+
+    def _build_bitvectors(self) -> None:
+        n_nodes, n_trees = len(self.left), len(self.roots)
+        is_leaf = self.left == np.arange(n_nodes)
+        split = np.flatnonzero(~is_leaf)
+        tree_of = np.repeat(np.arange(n_trees), np.diff(np.append(self.roots, n_nodes)))
+
+        # Leaves of each tree numbered left to right; each split covers a contiguous run of them.
+        leaf_pos = np.zeros(n_nodes, dtype=np.intp)
+        first = np.zeros(n_nodes, dtype=np.intp)
+        last = np.zeros(n_nodes, dtype=np.intp)
+        n_leaves = np.zeros(n_trees, dtype=np.intp)
+        for t, root in enumerate(self.roots):
+            stack, count = [(root, False)], 0
+            while stack:
+                node, done = stack.pop()
+                if is_leaf[node]:
+                    leaf_pos[node] = first[node] = last[node] = count
+                    count += 1
+                elif done:
+                    first[node], last[node] = first[self.left[node]], last[self.right[node]]
+                else:
+                    stack += [(node, True), (self.right[node], False), (self.left[node], False)]
+            n_leaves[t] = count
+
+        words = (int(n_leaves.max()) + 63) // 64
+        table_bytes = (len(split) + self.n_features_in_) * n_trees * words * 8
+        if table_bytes > BITVECTOR_MAX_BYTES:
+            self._bitvectors = None
+            return
+
+        # mask[s] has every bit set except the leaves under split s's left child.
+        bit = np.arange(words * 64)
+        lo, hi = first[self.left[split]], last[self.left[split]]
+        keep = (bit < lo[:, None]) | (bit > hi[:, None])
+        masks = np.packbits(keep, axis=1, bitorder="little").view(np.uint64)
+
+        thresholds, tables = [], []
+        for f in range(self.n_features_in_):
+            mine = np.flatnonzero(self.feature[split] == f)
+            mine = mine[np.argsort(self.threshold[split[mine]], kind="stable")]
+            table = np.full((len(mine) + 1, n_trees, words), np.uint64(0xFFFFFFFFFFFFFFFF))
+            table[np.arange(1, len(mine) + 1), tree_of[split[mine]]] = masks[mine]
+            thresholds.append(self.threshold[split[mine]])
+            tables.append(np.bitwise_and.accumulate(table, axis=0))
+        offsets = np.cumsum([0] + [len(t) for t in thresholds[:-1]]) + np.arange(self.n_features_in_)
+
+        leaf_node = np.zeros(n_trees * words * 64, dtype=np.intp)
+        leaves = np.flatnonzero(is_leaf)
+        leaf_node[tree_of[leaves] * words * 64 + leaf_pos[leaves]] = leaves
+        self._bitvectors = dict(thresholds=thresholds, offsets=offsets, table=np.concatenate(tables),
+                                leaf_node=leaf_node, words=words)
+
+    # ─────────────── inference ───────────────
+    def _leaves_bitvector(self, X: np.ndarray) -> np.ndarray:
+        bv = self._bitvectors
+        n, n_trees, words = X.shape[0], len(self.roots), bv["words"]
+        rank = np.empty((n, self.n_features_in_), dtype=np.intp)
+        for f, thresholds in enumerate(bv["thresholds"]):
+            # Number of this feature's splits the row goes right at (x > threshold).
+            rank[:, f] = np.searchsorted(thresholds, X[:, f], side="left") + bv["offsets"][f]
+        acc = np.take(bv["table"], rank[:, 0], axis=0)
+        for f in range(1, self.n_features_in_):
+            np.bitwise_and(acc, np.take(bv["table"], rank[:, f], axis=0), out=acc)
+
+        # Exit leaf = lowest set bit: isolate it, then read its exponent as a float64.
+        pos = None
+        for w in range(words - 1, -1, -1):
+            word = acc[:, :, w]
+            low = word & (~word + np.uint64(1))
+            at = (low.astype(np.float64).view(np.int64) >> 52) - 1023 + 64 * w
+            pos = at if pos is None else np.where(word != 0, at, pos)
+        return np.take(bv["leaf_node"], pos + np.arange(n_trees) * words * 64)
+
+    def _leaves_traverse(self, X: np.ndarray) -> np.ndarray:
+        Xf = np.ascontiguousarray(X).ravel()
+        base = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = Xf[base + self.feature[node]]
+            go_left = (x <= self.threshold[node]) | (np.isnan(x) & self.missing_left[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def apply(self, X) -> np.ndarray:
+        """(n_rows, n_trees) index of the leaf every row lands in, in every tree."""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        # sklearn compares float32 inputs with float64 thresholds.
+        X = X.astype(np.float32).astype(np.float64)
+        if self._bitvectors is None or np.isnan(X).any():
+            return self._leaves_traverse(X)
+        if X.shape[0] <= BLOCK_ROWS:
+            return self._leaves_bitvector(X)
+        return np.concatenate([self._leaves_bitvector(X[i:i + BLOCK_ROWS]) for i in range(0, X.shape[0], BLOCK_ROWS)])
+
+    def predict(self, X) -> np.ndarray:
+        leaves = np.ascontiguousarray(self.apply(X).T)          # (n_trees, n_rows)
+        p = self.params
+        if self.kind == "tree":
+            return self.classes_.take(np.argmax(np.take(self.value, leaves[0], axis=0), axis=1), axis=0)
+        if self.kind == "forest":
+            # out = 0; out += proba_t for each tree in order; out /= n_trees
+            proba = _sum_in_order(np.take(self.value, leaves, axis=0))
+            proba /= len(self.roots)
+            return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+        if self.kind == "gb":
+            n, K = leaves.shape[1], p["K"]
+            # Tree t is stage t // K, class t % K; raw = init, then raw += learning_rate * leaf value per stage.
+            contrib = p["scale"] * np.take(self.value[:, 0], leaves).reshape(p["n_stages"], K, n).transpose(0, 2, 1)
+            raw = _sum_in_order(np.concatenate([np.broadcast_to(p["init_raw"], (1, n, K)), contrib]))
+            if K == 1:
+                return self.classes_[(raw[:, 0] >= 0).astype(int)]
+            return self.classes_[np.argmax(raw, axis=1)]
+        # AdaBoost (SAMME): sum_t where(pred_t == class, w_t, -w_t / (n_classes - 1)) / sum(w)
+        n_classes = len(self.classes_)
+        votes = np.argmax(np.take(self.value, leaves, axis=0), axis=2)
+        hit = votes[:, :, None] == np.arange(n_classes)
+        w = p["weights"][:, None, None]
+        pred = _sum_in_order(np.where(hit, w, -1 / (n_classes - 1) * w))
+        pred /= p["weight_sum"]
+        if n_classes == 2:
+            pred[:, 0] *= -1
+            return self.classes_.take(pred.sum(axis=1) > 0, axis=0)
+        return self.classes_.take(np.argmax(pred, axis=1), axis=0)
+
+    def verify(self, est, X) -> bool:
+        """True when `predict` matches `est.predict` exactly on X."""
+        X = np.asarray(X, dtype=np.float64)
+        return bool(np.array_equal(self.predict(X), est.predict(X)))
@@ -0,0 +1,64 @@
+import math, threading, time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    LRU + TTL memo of model outputs keyed by (disease, model version, features).
+
+    Feature vectors are canonicalised first (floats, -0.0 → 0.0, NaN → None)
+    so equivalent submissions share an entry. Entries expire after `ttl`
+    seconds, the least recently used one is evicted past `maxsize`, and
+    `invalidate(disease)` drops a disease's entries when a new model is
+    promoted. `maxsize=0` disables caching.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(disease: str, version: str, row) -> tuple:
+        return (disease, version, tuple(None if math.isnan(v) else (v or 0.0) for v in map(float, row)))
+
+    def get(self, key):
+        """Cached value for key, or None on a miss."""
+        if not self.maxsize:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, disease: str = None) -> None:
+        """Drop every entry, or only those of one disease."""
+        with self._lock:
+            if disease is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[0] == disease]:
+                    del self._data[key]
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
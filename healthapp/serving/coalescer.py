@@ -0,0 +1,71 @@
+import queue, threading, time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class PredictionCoalescer:
+    """
+    Micro-batches concurrent single-row predictions per disease.
+
+    Each disease gets a queue and a worker thread. The worker takes the first
+    waiting row, keeps collecting for at most `window` seconds or until
+    `max_batch` rows are waiting, then scores them all with one call to
+    `score_fn(disease, matrix)` and hands every caller its own row's result.
+    A caller waits at most `timeout` seconds before giving up.
+    """
+
+    def __init__(self, score_fn, window: float = 0.002, max_batch: int = 64, timeout: float = 1.0):
+        self.score_fn = score_fn
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queues: dict = {}
+        self._lock = threading.Lock()
+
+    def _queue_for(self, disease: str) -> queue.Queue:
+        q = self._queues.get(disease)
+        if q is None:
+            with self._lock:
+                q = self._queues.get(disease)
+                if q is None:
+                    q = queue.Queue()
+                    threading.Thread(target=self._run, args=(disease, q),
+                                     name=f"coalescer-{disease}", daemon=True).start()
+                    self._queues[disease] = q
+        return q
+
+    def predict(self, disease: str, row: np.ndarray):
+        """Score one feature row, sharing the model call with concurrent requests."""
+        fut = Future()
+        self._queue_for(disease).put((row, fut))
+        try:
+            return fut.result(timeout=self.timeout)
+        except TimeoutError:
+            fut.cancel()
+            raise
+
+    def _run(self, disease: str, q: queue.Queue) -> None:
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Drop callers that already timed out or were cancelled.
+            batch = [(row, fut) for row, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                y_hat = self.score_fn(disease, np.vstack([row for row, _ in batch]))
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), y in zip(batch, y_hat):
+                fut.set_result(y)
@@ -0,0 +1,63 @@
+import threading
+
+
+class ResultsCompactor:
+    """
+    Background upkeep for the per-disease ResultsStores.
+
+    Every `interval` seconds each store seals its active file if it has
+    outgrown its size or age limit (appends do this too, but an idle store
+    would otherwise never roll over) and compacts its sealed segments, and
+    each disease's ScreeningStats (if given) catch up with the log and save a
+    checkpoint. Every worker runs one; the stores serialise the actual
+    changes through the segment manifest's lock.
+    """
+
+    def __init__(self, stores: dict, interval: float = 60.0, stats: dict = None):
+        self.stores = stores
+        self.interval = interval
+        self.stats = stats or {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> int:
+        """One pass over every store; returns the number of segments compacted."""
+        done = 0
+        for disease, store in self.stores.items():
+            try:
+                store.rotate_if_due()
+                done += store.compact()
+            except Exception as e:
+                print(f"❌ Couldn't compact {disease} results: {e}")
+            if disease in self.stats:
+                try:
+                    self.stats[disease].refresh()
+                    self.stats[disease].checkpoint()
+                except Exception as e:
+                    print(f"❌ Couldn't checkpoint {disease} stats: {e}")
+        return done
+
+    def checkpoint(self) -> None:
+        """Save every disease's stats (at shutdown)."""
+        for disease, stats in self.stats.items():
+            try:
+                stats.checkpoint()
+            except Exception as e:
+                print(f"❌ Couldn't checkpoint {disease} stats: {e}")
+
+    def start(self) -> "ResultsCompactor":
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="results-compactor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
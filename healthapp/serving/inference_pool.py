@@ -0,0 +1,38 @@
+"""
+Entry points for inference in a separate process (asgi.py's
+ASGI_INFERENCE_POOL=process). Kept apart from the web modules so a spawned
+pool worker only imports what scoring needs.
+"""
+import time
+
+from healthapp.serving.registry import ModelRegistry
+from healthapp.serving.startup import block_import
+
+_registry = None
+
+
+def init_worker(configs: dict) -> None:
+    """Pool initializer: each worker loads its own model registry."""
+    global _registry
+    block_import("pandas")
+    _registry = ModelRegistry(configs, poll_interval=0)
+    _registry.refresh()
+
+
+def score(disease: str, matrix, version: str):
+    """
+    Score with exactly the model version the caller keyed its cache on.
+    Returns (predictions, {"transform": seconds, "predict": seconds}); the
+    timings go back to the parent, whose /metrics is the one that gets scraped.
+    """
+    bundle = _registry.get(disease)
+    if bundle is None or bundle.version != version:
+        _registry.refresh()
+        bundle = _registry.get(disease)
+    if bundle is None or bundle.version != version:
+        raise RuntimeError(f"{disease} model {version} isn't loaded in the inference worker yet")
+    t0 = time.perf_counter()
+    X = bundle.transform(matrix)
+    t1 = time.perf_counter()
+    y_hat = bundle.predict(X)
+    return y_hat, {"transform": t1 - t0, "predict": time.perf_counter() - t1}
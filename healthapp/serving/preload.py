@@ -0,0 +1,110 @@
+import gc, mmap
+
+import numpy as np
+
+
+def _shared_copy(a: np.ndarray) -> np.ndarray:
+    """Copy an array into an anonymous MAP_SHARED mapping and return a read-only view of it."""
+    buf = mmap.mmap(-1, max(a.nbytes, 1))
+    out = np.frombuffer(buf, dtype=a.dtype, count=a.size).reshape(a.shape)
+    out[...] = a
+    out.flags.writeable = False
+    return out
+
+
+def share_arrays(obj, min_bytes: int = 4096) -> int:
+    """
+    Move the numeric arrays held by a fitted object graph into shared memory.
+
+    Walks instance attributes, lists, tuples and dicts reachable from `obj`
+    and replaces every numeric ndarray of at least `min_bytes` with a
+    read-only copy living in an anonymous shared mapping. Called in the
+    gunicorn master before fork, the pages behind those arrays are shared by
+    every worker and can never be copied on write, since nothing may write
+    to them. Returns the number of bytes moved.
+    """
+    moved = {}
+    seen = set()
+
+    def convert(a):
+        if id(a) not in moved:
+            moved[id(a)] = _shared_copy(a)
+        return moved[id(a)]
+
+    def mapped(a) -> bool:
+        # Already backed by a mapping: one made here, or a model bundle's file.
+        while isinstance(a, np.ndarray):
+            a = a.base
+        if isinstance(a, memoryview):
+            a = a.obj
+        return isinstance(a, mmap.mmap)
+
+    def eligible(v) -> bool:
+        return isinstance(v, np.ndarray) and v.dtype != object and v.nbytes >= min_bytes and not mapped(v)
+
+    def walk(o) -> None:
+        if id(o) in seen or isinstance(o, (str, bytes, int, float, bool, type(None), np.ndarray, type)):
+            return
+        seen.add(id(o))
+        if isinstance(o, dict):
+            items = o
+        elif isinstance(o, list):
+            for i, v in enumerate(o):
+                if eligible(v):
+                    o[i] = convert(v)
+                else:
+                    walk(v)
+            return
+        elif isinstance(o, tuple):
+            for v in o:
+                walk(v)
+            return
+        else:
+            items = getattr(o, "__dict__", None)
+            if not isinstance(items, dict):
+                return
+        for k, v in list(items.items()):
+            if eligible(v):
+                items[k] = convert(v)
+            else:
+                walk(v)
+
+    walk(obj)
+    return sum(a.nbytes for a in moved.values())
+
+
+def memory_usage() -> dict:
+    """
+    Resident memory of this process in KiB: rss, pss (shared pages divided
+    among the processes mapping them), shared and private. Linux only;
+    returns {} elsewhere.
+    """
+    fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+              "Private_Clean": "private", "Private_Dirty": "private"}
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as fp:
+            for line in fp:
+                name, _, rest = line.partition(":")
+                if name in fields:
+                    usage[fields[name]] = usage.get(fields[name], 0) + int(rest.split()[0])
+    except (OSError, ValueError):
+        return {}
+    return usage
+
+
+def report_memory(label: str) -> None:
+    usage = memory_usage()
+    if usage:
+        print(f"📊 {label}: RSS {usage['rss'] / 1024:.1f} MiB, PSS {usage['pss'] / 1024:.1f} MiB, "
+              f"shared {usage['shared'] / 1024:.1f} MiB, private {usage['private'] / 1024:.1f} MiB", flush=True)
+
+
+def freeze() -> None:
+    """
+    Collect once and move every surviving object to the permanent generation,
+    so the garbage collector in the workers never touches (and copies) the
+    pages holding the preloaded objects' headers.
+    """
+    gc.collect()
+    gc.freeze()
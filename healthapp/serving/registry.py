@@ -0,0 +1,305 @@
+import os, pickle, threading, time
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from healthapp.inference.bundle import MANIFEST, checksum, read_bundle, read_manifest, reference_rows
+from healthapp.inference.preprocessor import CompiledPreprocessor, sklearn_transform
+from healthapp.inference.trees import MAX_ROWS, TreeEnsemble
+
+
+@dataclass
+class ModelBundle:
+    """Everything the web app needs to score one disease."""
+    disease: str
+    model: object
+    preprocessor: object
+    version: str
+    fingerprint: tuple = field(repr=False)
+    loaded_at: float = field(default_factory=time.time)
+    compiled: object = field(default=None, repr=False)
+    features: list = field(default_factory=list, repr=False)
+    columns: object = field(default=None, repr=False)
+    engine: object = field(default=None, repr=False)
+
+    def transform(self, matrix):
+        """
+        Pre-process a (n_rows, n_features) float matrix in PREDICTION_FEATURES
+        order; `columns` reorders it into the pre-processor's fit-time order.
+        """
+        if self.compiled is not None:
+            return self.compiled.transform(matrix, self.columns)
+        if self.columns is not None:
+            matrix = matrix[:, self.columns]
+        return sklearn_transform(self.preprocessor, matrix)
+
+    def predict(self, X):
+        """
+        `model.predict`, through the array-backed tree engine when there is one
+        (always, for a bundle-loaded tree model, which has no sklearn model).
+        """
+        if self.engine is not None and (self.model is None or len(X) <= MAX_ROWS):
+            return self.engine.predict(X)
+        return self.model.predict(X)
+
+
+def _stat_fingerprint(paths: list) -> tuple:
+    """Cheap change detector: (mtime_ns, size) of every artefact, None if missing."""
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+def _fit_columns(fitted, features: list):
+    """
+    Indices that put a matrix in `features` order into the order the
+    pre-processor was fitted with (its `feature_names_in_`, or a bundle's
+    feature schema), or None if it already is. Raises ValueError when the two
+    sets of names differ.
+    """
+    if fitted is None:
+        return None
+    fitted = [str(name) for name in fitted]
+    if sorted(fitted) != sorted(features):
+        raise ValueError(f"PREDICTION_FEATURES {features} don't match the fitted columns {fitted}")
+    if fitted == list(features):
+        return None
+    return np.array([features.index(name) for name in fitted], dtype=np.intp)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of model + pre-processor per disease.
+
+    Artefacts are loaded once; a background thread polls the `final_models/`
+    files and, when their mtime/size and then checksum change, loads the new
+    pair off the request path and swaps it in with a single dict assignment.
+    Requests always see either the old bundle or the new one, never a mix.
+    A disease with a BUNDLE_PATH is memory-mapped from its bundle
+    (healthapp.inference.bundle) as long as the bundle was exported from the
+    current pickles; otherwise the pickles are loaded.
+
+    `load_workers > 1` loads the diseases concurrently. With `lazy=True` nothing
+    is loaded up front: the watcher warms every disease in the background as
+    soon as it starts, and `get()` loads a disease that isn't there yet on demand.
+    """
+
+    def __init__(self, configs: dict, poll_interval: float = 5.0, load_workers: int = 1, lazy: bool = False):
+        self.configs = configs
+        self.poll_interval = poll_interval
+        self.load_workers = load_workers
+        self.lazy = lazy
+        self.load_times: dict = {}
+        self._bundles: dict = {}
+        self._reported: set = set()
+        self._failed: dict = {}
+        self._listeners: list = []
+        self._lock = threading.Lock()
+        self._disease_locks = {d: threading.Lock() for d in configs}
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ─────────────── loading ───────────────
+    def _paths(self, disease: str) -> list:
+        """Model/pre-processor pickles, their compiled extras, then the bundle manifest."""
+        cfg = self.configs[disease]
+        bundle_dir = cfg.get("BUNDLE_PATH")
+        return [cfg["MODEL_PATH"], cfg["PREPROCESSOR_PATH"], cfg.get("COMPILED_PREPROCESSOR_PATH", ""),
+                cfg.get("COMPILED_MODEL_PATH", ""), os.path.join(bundle_dir, MANIFEST) if bundle_dir else ""]
+
+    def _compile(self, disease: str, preprocessor, compiled_path: str):
+        """
+        The exported compiled pre-processor (or one compiled on the spot), but
+        only if it reproduces the sklearn pipeline exactly on the training rows.
+        """
+        compiled = None
+        try:
+            if compiled_path and os.path.exists(compiled_path):
+                with open(compiled_path, "rb") as fp:
+                    compiled = pickle.load(fp)
+            else:
+                compiled = CompiledPreprocessor.from_pipeline(preprocessor)
+            fitted = getattr(preprocessor, "feature_names_in_", None)
+            if fitted is not None and compiled.feature_names != [str(name) for name in fitted]:
+                print(f"❌ {disease.capitalize()} compiled pre-processor columns differ from the pipeline; using sklearn.")
+                return None
+            if compiled.verify(preprocessor):
+                return compiled
+            print(f"❌ {disease.capitalize()} compiled pre-processor differs from the pipeline; using sklearn.")
+        except Exception as e:
+            print(f"❌ {disease.capitalize()} pre-processor can't be compiled ({e}); using sklearn.")
+        return None
+
+    def _compile_model(self, disease: str, model, preprocessor, engine_path: str):
+        """
+        The exported tree engine (or one flattened on the spot), but only if it
+        predicts exactly what the model does on the transformed training rows.
+        None for models the engine doesn't cover.
+        """
+        exported = bool(engine_path) and os.path.exists(engine_path)
+        if not exported and not TreeEnsemble.supports(model):
+            return None
+        try:
+            if exported:
+                with open(engine_path, "rb") as fp:
+                    engine = pickle.load(fp)
+            else:
+                engine = TreeEnsemble.from_estimator(model)
+            rows = reference_rows(preprocessor)
+            if rows is None:
+                print(f"❌ {disease.capitalize()} tree engine can't be verified without training rows; using sklearn.")
+                return None
+            if engine.verify(model, sklearn_transform(preprocessor, np.asarray(rows, dtype=np.float64))):
+                return engine
+            print(f"❌ {disease.capitalize()} tree engine differs from the model; using sklearn.")
+        except Exception as e:
+            print(f"❌ {disease.capitalize()} model can't be compiled ({e}); using sklearn.")
+        return None
+
+    def _load(self, disease: str) -> bool:
+        """(Re)load one disease if its artefacts changed. Returns True on swap."""
+        with self._disease_locks[disease]:
+            return self._load_locked(disease)
+
+    def _load_locked(self, disease: str) -> bool:
+        paths = self._paths(disease)
+        before = _stat_fingerprint(paths)
+        current = self._bundles.get(disease)
+        if current is not None and current.fingerprint == before:
+            return False
+        if self._failed.get(disease) == before:
+            return False
+        has_pickles, has_bundle = None not in before[:2], before[4] is not None
+        if not has_pickles and not has_bundle:
+            if current is None and disease not in self._reported:
+                self._reported.add(disease)
+                print(f"❌ Couldn't load {disease} artefacts: missing {[p for p, s in zip(paths, before[:2]) if s is None]}")
+            return False
+        try:
+            bundle_dir = self.configs[disease].get("BUNDLE_PATH")
+            manifest = read_manifest(bundle_dir) if has_bundle else None
+            if manifest is not None and has_pickles and manifest["version"] != checksum(paths[:2]):
+                print(f"❌ {disease.capitalize()} bundle {manifest['version']} wasn't exported from the current pickles; "
+                      f"loading the pickles.")
+                manifest = None
+            # Same content hash as the bundle's: the derived compiled caches don't make a new version.
+            version = manifest["version"] if manifest is not None else checksum(paths[:2])
+            if current is not None and version == current.version:
+                # Touched but identical content: just remember the new stat.
+                self._bundles[disease] = replace(current, fingerprint=before)
+                return False
+            start = time.perf_counter()
+            features = list(self.configs[disease]["PREDICTION_FEATURES"])
+            if manifest is not None:
+                loaded = read_bundle(bundle_dir)
+                model = preprocessor = compiled = engine = None
+                if isinstance(loaded.preprocessor, CompiledPreprocessor):
+                    compiled = loaded.preprocessor
+                else:
+                    preprocessor = loaded.preprocessor
+                if isinstance(loaded.model, TreeEnsemble):
+                    engine = loaded.model
+                else:
+                    model = loaded.model
+                columns = _fit_columns(loaded.features, features)
+            else:
+                with open(paths[0], "rb") as fp:
+                    model = pickle.load(fp)
+                with open(paths[1], "rb") as fp:
+                    preprocessor = pickle.load(fp)
+                columns = _fit_columns(getattr(preprocessor, "feature_names_in_", None), features)
+                compiled = self._compile(disease, preprocessor, paths[2])
+                engine = self._compile_model(disease, model, preprocessor, paths[3])
+        except Exception as e:
+            # Most likely a half-written file from a running retrain; keep the
+            # old bundle and try again once the files change again.
+            self._failed[disease] = before
+            print(f"❌ Couldn't load {disease} artefacts: {e}")
+            return False
+        if _stat_fingerprint(paths) != before:
+            return False
+        self.load_times[disease] = time.perf_counter() - start
+        bundle = ModelBundle(disease, model, preprocessor, version, before, compiled=compiled,
+                             features=features, columns=columns, engine=engine)
+        self._bundles[disease] = bundle
+        source = " from its bundle" if manifest is not None else ""
+        print(f"✅ {disease.capitalize()} model & pre-processor loaded{source} (version {version}).")
+        for listener in list(self._listeners):
+            listener(disease, bundle)
+        return True
+
+    def refresh(self) -> None:
+        """Check every disease once and swap in any changed artefacts."""
+        with self._lock:
+            if self.load_workers > 1:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=self.load_workers, thread_name_prefix="model-load") as pool:
+                    list(pool.map(self._load, self.configs))
+            else:
+                for disease in self.configs:
+                    self._load(disease)
+
+    # ─────────────── public API ───────────────
+    def get(self, disease: str):
+        """Return the current ModelBundle for a disease, or None if unavailable."""
+        bundle = self._bundles.get(disease)
+        if bundle is None and self.lazy and disease in self.configs:
+            self._load(disease)
+            bundle = self._bundles.get(disease)
+        return bundle
+
+    def drop_estimators(self) -> list:
+        """
+        Let go of the sklearn model of every bundle that predicts through a
+        verified tree engine, which then serves batches of every size. The
+        engine's node tables are plain ndarrays that preload can share, while
+        sklearn's Cython trees can't be; keeping both would give every forked
+        worker its own copy of the model anyway. A later reload brings the
+        model back. Returns the diseases whose model was dropped.
+        """
+        dropped = []
+        for disease in list(self._bundles):
+            with self._disease_locks[disease]:
+                bundle = self._bundles.get(disease)
+                if bundle is not None and bundle.engine is not None and bundle.model is not None:
+                    self._bundles[disease] = replace(bundle, model=None)
+                    dropped.append(disease)
+        return dropped
+
+    def versions(self) -> dict:
+        return {d: b.version for d, b in self._bundles.items()}
+
+    def add_listener(self, callback) -> None:
+        """Register callback(disease, bundle), invoked after every swap."""
+        self._listeners.append(callback)
+
+    def start(self) -> "ModelRegistry":
+        """Load everything now (unless lazy) and start the background watcher."""
+        if not self.lazy:
+            self.refresh()
+        if self.poll_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self) -> None:
+        # In lazy mode the first pass runs immediately and warms every disease.
+        wait = 0 if self.lazy else self.poll_interval
+        while not self._stop.wait(wait):
+            wait = self.poll_interval
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Model registry refresh failed: {e}")
@@ -0,0 +1,594 @@
+import json, os, threading, time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from healthapp.serving import segments
+
+# Bytes read per backwards step when paging from the end of the log.
+_REVERSE_BLOCK = 64 * 1024
+# Sealed segments kept decoded per store (the newest ones serve most reads).
+_SEALED_CACHE = 4
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+
+class ResultsStore:
+    """
+    Append-only JSONL results log with an id → byte-offset index.
+
+    The index covers the active file and lives in memory and in a sidecar
+    file (`<results>.idx`, one "<id> <offset>" line per record). On startup
+    the sidecar is loaded and the tail of the results file that it does not
+    cover yet is re-scanned, so a crash between the two writes only costs a
+    short scan. Torn (partial) lines in either file are ignored, and lookups
+    that miss fall back to the same tail scan, which also picks up records
+    appended by other worker processes.
+
+    With `segment_bytes` or `segment_seconds` set, an append that finds the
+    active file past either limit first seals it into `segments/` (see
+    healthapp.serving.segments) and starts a new one; `compact()` turns
+    sealed segments into compressed columnar archives and drops the oldest
+    archives beyond `retain_bytes`. Reads walk the active file and then the
+    sealed segments newest first, stopping as soon as they have what they
+    need; a lookup by id skips the segments whose id filter rules it out. Cursors and offsets returned by `page()` are positions in the
+    whole log, so they stay valid across rotations.
+    """
+
+    def __init__(self, results_file: str, segment_bytes: int = 0, segment_seconds: float = 0,
+                 retain_bytes: int = 0):
+        self.results_file = results_file
+        self.index_file = f"{results_file}.idx"
+        self.segment_dir = os.path.join(os.path.dirname(results_file) or ".", "segments")
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retain_bytes = retain_bytes
+        self._offsets: dict = {}
+        self._scanned_upto = 0
+        self._base = 0       # log offset of the active file's first byte
+        self._ino = -1       # active file the in-memory index belongs to (None: no file yet)
+        self._manifest_cache = (None, segments.empty_manifest())
+        self._sealed: OrderedDict = OrderedDict()
+        self._filters: dict = {}  # segment file → decoded IdFilter
+        self._listeners: list = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(results_file) or ".", exist_ok=True)
+        if segment_seconds:
+            with segments.locked(self.segment_dir):
+                manifest = segments.load_manifest(self.segment_dir)
+                if manifest["active_since"] is None:
+                    manifest["active_since"] = time.time()
+                    segments.save_manifest(self.segment_dir, manifest)
+        with self._lock:
+            self._sync()
+
+    # ─────────────── recovery ───────────────
+    def _active_ino(self):
+        try:
+            return os.stat(self.results_file).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _manifest_lock(self):
+        """
+        The segment lock when this log is segmented. `_seal` holds it from the
+        rename to the manifest update, so under it the manifest's `next_base`
+        is the base of whatever file is at `results_file`.
+        """
+        if self.segment_bytes or self.segment_seconds or os.path.isdir(self.segment_dir):
+            return segments.locked(self.segment_dir)
+        return nullcontext()
+
+    def _manifest(self) -> dict:
+        """The segment manifest, re-read only when the file changed."""
+        try:
+            st = os.stat(os.path.join(self.segment_dir, segments.MANIFEST))
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            key = None
+        if key != self._manifest_cache[0]:
+            manifest = segments.load_manifest(self.segment_dir) if key is not None else segments.empty_manifest()
+            self._manifest_cache = (key, manifest)
+            current = {entry["file"] for entry in manifest["segments"]}
+            self._filters = {name: f for name, f in self._filters.items() if name in current}
+        return self._manifest_cache[1]
+
+    def _sync(self, ino=-1) -> None:
+        """
+        Catch up with rotations done by any process (hold `_lock`): take the
+        active file's base from the manifest and, if the file itself changed,
+        drop the in-memory index and rebuild it for the new one.
+        """
+        self._base = self._manifest()["next_base"]
+        if ino == -1:
+            ino = self._active_ino()
+        if ino != self._ino:
+            self._ino = ino
+            self._offsets.clear()
+            self._scanned_upto = 0
+            self._recover()
+
+    def _recover(self) -> None:
+        """Rebuild the in-memory map from the sidecar plus a scan of the unindexed tail."""
+        size = os.path.getsize(self.results_file) if os.path.exists(self.results_file) else 0
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "rb") as fp:
+                for line in fp:
+                    if not line.endswith(b"\n"):
+                        break  # torn final entry
+                    parts = line.split()
+                    if len(parts) != 2 or not parts[1].isdigit():
+                        continue
+                    offset = int(parts[1])
+                    if offset < size:
+                        self._offsets[parts[0].decode()] = offset
+        # Offsets are line starts, so rescanning from the largest one re-reads
+        # at most one known record before reaching anything unindexed.
+        self._scanned_upto = max(self._offsets.values(), default=0)
+        found = self._scan_tail()
+        if found:
+            self._append_index(found)
+
+    def _scan_tail(self) -> list:
+        """Index complete lines past `_scanned_upto`. Returns the new (id, offset) pairs."""
+        if not os.path.exists(self.results_file):
+            return []
+        found = []
+        with open(self.results_file, "rb") as fp:
+            fp.seek(self._scanned_upto)
+            offset = self._scanned_upto
+            for line in fp:
+                if not line.endswith(b"\n"):
+                    break  # partial write still in flight (or torn by a crash)
+                try:
+                    rec_id = json.loads(line)["id"]
+                except (ValueError, KeyError, TypeError):
+                    rec_id = None
+                if rec_id is not None and rec_id not in self._offsets:
+                    self._offsets[rec_id] = offset
+                    found.append((rec_id, offset))
+                offset += len(line)
+            self._scanned_upto = offset
+        return found
+
+    def _append_index(self, entries: list) -> None:
+        with open(self.index_file, "ab") as fp:
+            fp.write("".join(f"{rec_id} {offset}\n" for rec_id, offset in entries).encode())
+
+    def _rewrite_index(self) -> None:
+        tmp_path = f"{self.index_file}.tmp"
+        with open(tmp_path, "wb") as fp:
+            fp.write("".join(f"{rec_id} {offset}\n" for rec_id, offset in self._offsets.items()).encode())
+        os.replace(tmp_path, self.index_file)
+
+    # ─────────────── writes ───────────────
+    def _open_active(self):
+        """
+        The active file opened for append and exclusively locked. Another
+        process may seal it while we wait for the lock, so retry until the
+        locked file is still the one at `results_file`.
+        """
+        while True:
+            fp = open(self.results_file, "ab+")
+            if fcntl is None:
+                return fp
+            fcntl.flock(fp, fcntl.LOCK_EX)
+            if self._active_ino() == os.fstat(fp.fileno()).st_ino:
+                return fp
+            fp.close()
+
+    @staticmethod
+    def _release(fp) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+        finally:
+            fp.close()
+
+    def _rotation_due(self, size: int) -> bool:
+        if not size:
+            return False
+        if self.segment_bytes and size >= self.segment_bytes:
+            return True
+        since = self._manifest()["active_since"]
+        return bool(self.segment_seconds and since is not None and time.time() - since >= self.segment_seconds)
+
+    def _seal(self, size: int) -> None:
+        """Move the locked, `size`-byte active file into segments/ (hold `_lock` and the file lock)."""
+        # Bring the index up to the locked file's end: its ids become the segment's filter.
+        self._sync(self._active_ino())
+        self._scan_tail()
+        ids = segments.IdFilter.build(self._offsets).to_json()
+        with segments.locked(self.segment_dir):
+            manifest = segments.load_manifest(self.segment_dir)
+            base = manifest["next_base"]
+            name = f"segment-{base:016d}.jsonl"
+            # The sidecar goes first: a reader that sees the old file without it just rescans.
+            if os.path.exists(self.index_file):
+                os.remove(self.index_file)
+            os.rename(self.results_file, os.path.join(self.segment_dir, name))
+            manifest["segments"].append({"file": name, "kind": "jsonl", "base": base, "end": base + size, "ids": ids})
+            manifest["next_base"] = base + size
+            manifest["active_since"] = time.time()
+            segments.save_manifest(self.segment_dir, manifest)
+        self._sync(None)
+
+    def rotate_if_due(self) -> bool:
+        """Seal the active file if it is past the size or age limit (for idle stores)."""
+        if not (self.segment_bytes or self.segment_seconds) or not os.path.exists(self.results_file):
+            return False
+        with self._lock:
+            fp = self._open_active()
+            try:
+                size = fp.seek(0, os.SEEK_END)
+                if not self._rotation_due(size):
+                    return False
+                self._seal(size)
+                return True
+            finally:
+                self._release(fp)
+
+    def append_many(self, recs: list, fsync: bool = False) -> None:
+        """Append records in one write and index them; optionally fsync the batch."""
+        if not recs:
+            return
+        lines = [(json.dumps(rec) + "\n").encode("utf-8") for rec in recs]
+        with self._lock:
+            while True:
+                fp = self._open_active()
+                try:
+                    end = start = fp.seek(0, os.SEEK_END)
+                    if self._rotation_due(end):
+                        self._seal(end)
+                        continue
+                    with self._manifest_lock():
+                        self._sync(os.fstat(fp.fileno()).st_ino)
+                    base = self._base
+                    if end:
+                        fp.seek(end - 1)
+                        if fp.read(1) != b"\n":
+                            # Terminate a line torn by an earlier crash so it can't
+                            # swallow the records written now.
+                            fp.write(b"\n")
+                            end += 1
+                    fp.write(b"".join(lines))
+                    fp.flush()
+                    if fsync:
+                        os.fsync(fp.fileno())
+                    entries = []
+                    offset = end
+                    for rec, line in zip(recs, lines):
+                        self._offsets[rec["id"]] = offset
+                        entries.append((rec["id"], offset))
+                        offset += len(line)
+                    # Still under the file lock, so a rotation can't land in between.
+                    self._append_index(entries)
+                    break
+                finally:
+                    self._release(fp)
+            if self._scanned_upto >= start:
+                # Nobody else wrote in between; no need to rescan our own lines.
+                self._scanned_upto = max(self._scanned_upto, offset)
+        for listener in list(self._listeners):
+            listener(recs, base + end, base + offset)
+
+    def append(self, rec: dict) -> None:
+        self.append_many([rec])
+
+    def add_listener(self, fn) -> None:
+        """Call `fn(records, start, end)` with the log offsets after each append made through this store."""
+        self._listeners.append(fn)
+
+    # ─────────────── reads ───────────────
+    def _read_at(self, offset: int):
+        with open(self.results_file, "rb") as fp:
+            fp.seek(offset)
+            line = fp.readline()
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+    def get(self, rec_id: str, wait: float = 0.0):
+        """
+        Return one record by id, or None if unknown. Records in the active
+        file take a single seek; older ones are looked up in the sealed
+        segments whose id filter may hold them, newest first. With `wait` > 0 keep re-checking the tail for
+        that long, for records another worker has accepted but not flushed yet.
+        """
+        if not rec_id:
+            return None
+        deadline = time.monotonic() + wait
+        rec = self._get_active(rec_id)
+        if rec is None:
+            rec = self._get_sealed(rec_id)
+        while rec is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+            rec = self._get_active(rec_id)
+        if rec is None and wait:
+            rec = self._get_sealed(rec_id)  # it may have been sealed while we waited
+        return rec
+
+    def _get_active(self, rec_id: str):
+        with self._lock:
+            self._sync()
+            offset = self._offsets.get(rec_id)
+            if offset is None:
+                self._scan_tail()
+                offset = self._offsets.get(rec_id)
+        if offset is None:
+            return None
+        rec = self._read_at(offset)
+        if rec is None or rec.get("id") != rec_id:
+            # Index disagrees with the data file (e.g. it was replaced);
+            # rebuild from scratch rather than serve the wrong record.
+            with self._lock:
+                self._offsets.clear()
+                self._scanned_upto = 0
+                self._scan_tail()
+                self._rewrite_index()
+            offset = self._offsets.get(rec_id)
+            rec = self._read_at(offset) if offset is not None else None
+        return rec
+
+    def _sealed_segment(self, entry: dict):
+        """A sealed segment's rows (JSONL) or Archive, decoded once and kept in a small LRU."""
+        key = entry["file"]
+        with self._lock:
+            seg = self._sealed.get(key)
+            if seg is not None:
+                self._sealed.move_to_end(key)
+                return seg
+        path = os.path.join(self.segment_dir, key)
+        seg = segments.Archive(path) if entry["kind"] == "archive" else segments.read_jsonl(path, entry["base"])
+        with self._lock:
+            self._sealed[key] = seg
+            while len(self._sealed) > _SEALED_CACHE:
+                self._sealed.popitem(last=False)
+        return seg
+
+    def _sealed_rows(self, entry: dict) -> list:
+        seg = self._sealed_segment(entry)
+        return seg.rows() if isinstance(seg, segments.Archive) else seg
+
+    def _retrying(self, read):
+        """Run `read` again on a fresh manifest if a segment vanished under it (compacted or dropped)."""
+        try:
+            return read()
+        except FileNotFoundError:
+            with self._lock:
+                self._manifest_cache = (None, self._manifest_cache[1])
+                self._sealed.clear()
+            return read()
+
+    def _may_hold(self, entry: dict, rec_id: str) -> bool:
+        """False only if the segment's id filter rules `rec_id` out (segments sealed without one always may)."""
+        spec = entry.get("ids")
+        if spec is None:
+            return True
+        id_filter = self._filters.get(entry["file"])
+        if id_filter is None:
+            id_filter = self._filters[entry["file"]] = segments.IdFilter.from_json(spec)
+        return rec_id in id_filter
+
+    def _get_sealed(self, rec_id: str):
+        def read():
+            for entry in reversed(self._manifest()["segments"]):
+                if not self._may_hold(entry, rec_id):
+                    continue
+                seg = self._sealed_segment(entry)
+                if isinstance(seg, segments.Archive):
+                    ids = seg.column("field:id")
+                    if rec_id in ids:
+                        return seg.row(ids.index(rec_id))
+                else:
+                    for _, rec in seg:
+                        if rec.get("id") == rec_id:
+                            return rec
+            return None
+        return self._retrying(read)
+
+    def _iter_reverse(self, before=None):
+        """
+        Yield (offset, raw_line) for complete lines that end before byte `before`
+        (default: end of file), newest first, reading the file backwards in blocks.
+        """
+        if not os.path.exists(self.results_file):
+            return
+        with open(self.results_file, "rb") as fp:
+            end = fp.seek(0, os.SEEK_END)
+            pos = end if before is None else min(before, end)
+            buf = b""
+            found_end = False
+            while pos > 0:
+                step = min(_REVERSE_BLOCK, pos)
+                pos -= step
+                fp.seek(pos)
+                buf = fp.read(step) + buf
+                if not found_end:
+                    # Anything after the last newline is a write still in flight.
+                    k = buf.rfind(b"\n")
+                    if k == -1:
+                        continue
+                    buf = buf[:k + 1]
+                    found_end = True
+                while True:
+                    k = buf.rfind(b"\n", 0, len(buf) - 1)
+                    if k == -1:
+                        break
+                    yield pos + k + 1, buf[k + 1:]
+                    buf = buf[:k + 1]
+            if found_end and buf:
+                yield 0, buf
+
+    def _iter_newest(self, before=None):
+        """
+        Yield (log offset, record) newest first for records that start before
+        log offset `before`: the active file's tail, then sealed segments.
+        Offsets only ever decrease, so a segment sealed mid-walk isn't repeated.
+        """
+        with self._lock:
+            self._sync()
+            base = self._base
+        floor = before
+        for offset, line in self._iter_reverse(None if before is None else max(before - base, 0)):
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict):
+                floor = base + offset
+                yield floor, rec
+        for entry in reversed(self._manifest()["segments"]):
+            if floor is not None and entry["base"] >= floor:
+                continue
+            for offset, rec in reversed(self._sealed_rows(entry)):
+                if floor is None or offset < floor:
+                    floor = offset
+                    yield offset, rec
+
+    def page(self, before=None, limit: int = 20, exclude=None):
+        """
+        Newest-first page of records older than cursor `before`.
+        Returns (records, next_cursor); next_cursor is None on the last page.
+        Only the part of the log needed for this page is read.
+        """
+        def read():
+            records = []
+            last_offset = None
+            for offset, rec in self._iter_newest(before):
+                if rec.get("id") == exclude:
+                    continue
+                if len(records) == limit:
+                    return records, last_offset
+                records.append(rec)
+                last_offset = offset
+            return records, None
+        return self._retrying(read)
+
+    def read_from(self, offset: int):
+        """
+        Records that start at or after log offset `offset`, in write order,
+        and the log offset just past the last complete one (pass it back next
+        time to read only what was appended since). Segments dropped by
+        retention are skipped.
+        """
+        def read():
+            while True:
+                # Pair the active file with the manifest it belongs to.
+                try:
+                    fp = open(self.results_file, "rb")
+                except FileNotFoundError:
+                    fp = None
+                with self._manifest_lock():
+                    manifest = self._manifest()
+                    ino = self._active_ino()
+                if (os.fstat(fp.fileno()).st_ino if fp is not None else None) == ino:
+                    break
+                if fp is not None:
+                    fp.close()
+            try:
+                out, upto = [], offset
+                for entry in manifest["segments"]:
+                    if entry["end"] > offset:
+                        out += [rec for start, rec in self._sealed_rows(entry) if start >= offset]
+                        upto = entry["end"]
+                base = manifest["next_base"]
+                local = max(upto - base, 0)
+                if fp is not None:
+                    fp.seek(local)
+                    for line in fp:
+                        if not line.endswith(b"\n"):
+                            break  # write still in flight
+                        try:
+                            rec = json.loads(line)
+                        except ValueError:
+                            rec = None
+                        if isinstance(rec, dict):
+                            out.append(rec)
+                        local += len(line)
+                return out, base + local
+            finally:
+                if fp is not None:
+                    fp.close()
+        return self._retrying(read)
+
+    def load_all(self) -> list:
+        """Every stored record in write order (sealed segments first), skipping unreadable lines."""
+        out = self._retrying(lambda: [rec for entry in self._manifest()["segments"]
+                                      for _, rec in self._sealed_rows(entry)])
+        if not os.path.exists(self.results_file):
+            return out
+        with open(self.results_file, "r", encoding="utf-8") as fp:
+            for line in fp:
+                if not line.strip():
+                    continue
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    continue
+        return out
+
+    # ─────────────── compaction ───────────────
+    def compact(self) -> int:
+        """
+        Rewrite sealed JSONL segments as columnar archives, then drop the
+        oldest archives while they take more than `retain_bytes` (0 keeps
+        everything). Safe to run from several processes at once; the archive
+        is built outside the lock and only the manifest swap is serialised.
+        Returns the number of segments compacted here.
+        """
+        if not os.path.exists(os.path.join(self.segment_dir, segments.MANIFEST)):
+            return 0
+        done = 0
+        for entry in [e for e in segments.load_manifest(self.segment_dir)["segments"] if e["kind"] == "jsonl"]:
+            src = os.path.join(self.segment_dir, entry["file"])
+            name = f"archive-{entry['base']:016d}.cols"
+            try:
+                rows = segments.read_jsonl(src, entry["base"])
+            except FileNotFoundError:
+                continue  # compacted by another process meanwhile
+            size = segments.write_archive(os.path.join(self.segment_dir, name), rows)
+            with segments.locked(self.segment_dir):
+                manifest = segments.load_manifest(self.segment_dir)
+                for current in manifest["segments"]:
+                    if current["file"] == entry["file"]:
+                        current.update(file=name, kind="archive", count=len(rows), bytes=size)
+                        if "ids" not in current:  # sealed before segments carried id filters
+                            current["ids"] = segments.IdFilter.build(rec["id"] for _, rec in rows if rec.get("id") is not None).to_json()
+                        segments.save_manifest(self.segment_dir, manifest)
+                        os.remove(src)
+                        done += 1
+                        break
+        if self.retain_bytes:
+            with segments.locked(self.segment_dir):
+                manifest = segments.load_manifest(self.segment_dir)
+                archives = [e for e in manifest["segments"] if e["kind"] == "archive"]
+                total = sum(e["bytes"] for e in archives)
+                dropped = []
+                for entry in archives:
+                    if total <= self.retain_bytes:
+                        break
+                    total -= entry["bytes"]
+                    dropped.append(entry)
+                if dropped:
+                    manifest["segments"] = [e for e in manifest["segments"] if e not in dropped]
+                    segments.save_manifest(self.segment_dir, manifest)
+                    for entry in dropped:
+                        try:
+                            os.remove(os.path.join(self.segment_dir, entry["file"]))
+                        except FileNotFoundError:
+                            pass
+        return done
+
+    def disk_usage(self) -> dict:
+        """Bytes on disk by kind: the active file, sealed JSONL segments and archives."""
+        usage = {"active": os.path.getsize(self.results_file) if os.path.exists(self.results_file) else 0,
+                 "jsonl": 0, "archive": 0}
+        for entry in self._manifest()["segments"]:
+            path = os.path.join(self.segment_dir, entry["file"])
+            if os.path.exists(path):
+                usage[entry["kind"]] += os.path.getsize(path)
+        return usage
@@ -0,0 +1,203 @@
+"""
+Sealed segments of a results log and their compressed columnar archives.
+
+ResultsStore appends to one active JSONL file. Once that file passes a size
+or age limit it is renamed into `segments/` next to it, and the compactor
+later rewrites each sealed segment as an archive: one zlib-compressed JSON
+array per field, plus the records' log offsets and key orders, so a lookup
+by id only inflates the id column. `segments/manifest.json` lists the sealed
+segments in write order with the range of log offsets each one covers and
+a Bloom filter of the ids it holds, so a lookup by id only opens the
+segments that may contain it.
+
+Offsets are positions in the logical log (every segment ever written, end to
+end; the active file starts at the manifest's `next_base`), so they never
+change when a segment is sealed, compacted or dropped and /results cursors
+stay valid across all three.
+"""
+import base64, hashlib, json, os, struct, threading, zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+ARCHIVE_MAGIC = b"HRA1"
+_HEADER = struct.Struct("<4sI")  # magic, header length
+_local_lock = threading.Lock()
+# Bloom filter sizing: 10 bits and 7 probes per id give about 1% false positives.
+_FILTER_BITS_PER_ID = 10
+_FILTER_HASHES = 7
+
+
+# ─────────────── manifest ───────────────
+def empty_manifest() -> dict:
+    return {"version": MANIFEST_VERSION, "next_base": 0, "active_since": None, "segments": []}
+
+
+def load_manifest(segment_dir: str) -> dict:
+    try:
+        with open(os.path.join(segment_dir, MANIFEST), "r", encoding="utf-8") as fp:
+            manifest = json.load(fp)
+    except FileNotFoundError:
+        return empty_manifest()
+    if manifest.get("version", 0) > MANIFEST_VERSION:
+        raise ValueError(f"{segment_dir} manifest version {manifest['version']} is newer than this code")
+    return manifest
+
+
+def save_manifest(segment_dir: str, manifest: dict) -> None:
+    path = os.path.join(segment_dir, MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        json.dump(manifest, fp, indent=1)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def locked(segment_dir: str):
+    """Hold the segment directory's lock (across processes) while changing the manifest."""
+    os.makedirs(segment_dir, exist_ok=True)
+    with _local_lock, open(os.path.join(segment_dir, ".lock"), "ab") as fp:
+        if fcntl is not None:
+            fcntl.flock(fp, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+
+
+# ─────────────── id filters ───────────────
+class IdFilter:
+    """Bloom filter over one segment's record ids, stored in its manifest entry under "ids"."""
+
+    def __init__(self, bits: int, hashes: int, data: bytes):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = data
+
+    @staticmethod
+    def _probes(rec_id: str, bits: int, hashes: int):
+        digest = hashlib.blake2b(str(rec_id).encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % bits for i in range(hashes)]
+
+    @classmethod
+    def build(cls, ids) -> "IdFilter":
+        ids = list(ids)
+        bits = max(64, len(ids) * _FILTER_BITS_PER_ID)
+        data = bytearray((bits + 7) // 8)
+        for rec_id in ids:
+            for bit in cls._probes(rec_id, bits, _FILTER_HASHES):
+                data[bit >> 3] |= 1 << (bit & 7)
+        return cls(bits, _FILTER_HASHES, bytes(data))
+
+    @classmethod
+    def from_json(cls, spec: dict) -> "IdFilter":
+        return cls(spec["bits"], spec["hashes"], base64.b64decode(spec["data"]))
+
+    def to_json(self) -> dict:
+        return {"bits": self.bits, "hashes": self.hashes, "data": base64.b64encode(self.data).decode("ascii")}
+
+    def __contains__(self, rec_id: str) -> bool:
+        return all(self.data[bit >> 3] >> (bit & 7) & 1 for bit in self._probes(rec_id, self.bits, self.hashes))
+
+
+# ─────────────── segments ───────────────
+def read_jsonl(path: str, base: int) -> list:
+    """(log offset, record) for every readable line of a sealed JSONL segment."""
+    rows = []
+    with open(path, "rb") as fp:
+        offset = base
+        for line in fp:
+            if line.endswith(b"\n"):
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    rec = None
+                if isinstance(rec, dict):
+                    rows.append((offset, rec))
+            offset += len(line)
+    return rows
+
+
+def write_archive(path: str, rows: list, level: int = 6) -> int:
+    """
+    Write (log offset, record) rows as a columnar archive and return its size.
+    Each field becomes one compressed JSON array (null where a record lacks
+    it); the distinct key orders are kept so records come back unchanged.
+    """
+    orders, order_of_row, fields = {}, [], {}
+    for i, (_, rec) in enumerate(rows):
+        order_of_row.append(orders.setdefault(tuple(rec), len(orders)))
+        for key, value in rec.items():
+            fields.setdefault(key, [None] * len(rows))[i] = value
+
+    blobs, columns, position = [], {}, 0
+    def add(name: str, values: list) -> None:
+        nonlocal position
+        blob = zlib.compress(json.dumps(values, separators=(",", ":")).encode("utf-8"), level)
+        columns[name] = [position, len(blob)]
+        blobs.append(blob)
+        position += len(blob)
+
+    add("offset", [offset for offset, _ in rows])
+    add("order", order_of_row)
+    for key, values in fields.items():
+        add(f"field:{key}", values)
+    header = json.dumps({"count": len(rows), "orders": [list(o) for o in orders], "columns": columns}).encode("utf-8")
+
+    # Per-process temporary name: two compactors may build the same archive at once.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(_HEADER.pack(ARCHIVE_MAGIC, len(header)))
+        fp.write(header)
+        for blob in blobs:
+            fp.write(blob)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class Archive:
+    """Read side of `write_archive`; columns are inflated on first use and kept."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            magic, length = _HEADER.unpack(fp.read(_HEADER.size))
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"{path} is not a results archive")
+            header = json.loads(fp.read(length))
+        self.count = header["count"]
+        self.orders = [tuple(o) for o in header["orders"]]
+        self._columns = header["columns"]
+        self._data_start = _HEADER.size + length
+        self._cache: dict = {}
+
+    def column(self, name: str) -> list:
+        if name not in self._cache:
+            spec = self._columns.get(name)
+            if spec is None:
+                values = [None] * self.count
+            else:
+                with open(self.path, "rb") as fp:
+                    fp.seek(self._data_start + spec[0])
+                    values = json.loads(zlib.decompress(fp.read(spec[1])))
+            self._cache[name] = values
+        return self._cache[name]
+
+    def fields(self) -> list:
+        return [name[len("field:"):] for name in self._columns if name.startswith("field:")]
+
+    def row(self, i: int) -> dict:
+        return {key: self.column(f"field:{key}")[i] for key in self.orders[self.column("order")[i]]}
+
+    def rows(self) -> list:
+        """(log offset, record) for every record, in write order."""
+        if "rows" not in self._cache:
+            self._cache["rows"] = [(offset, self.row(i)) for i, offset in enumerate(self.column("offset"))]
+        return self._cache["rows"]
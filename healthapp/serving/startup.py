@@ -0,0 +1,135 @@
+"""
+Startup timing for the web app.
+
+`StartupProfiler` records how long each boot phase of app.py takes and how long
+after process start the first request arrives. Run as a module for a full
+import-time breakdown of a fresh interpreter importing the app:
+
+    python -m healthapp.serving.startup --top 15 --budget 3.0
+
+which exits non-zero when boot takes longer than the budget (seconds).
+"""
+import importlib.abc, os, re, subprocess, sys, time
+from contextlib import contextmanager
+
+
+class _BlockedImport(importlib.abc.MetaPathFinder):
+    def __init__(self, name: str):
+        self.name = name
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname == self.name or fullname.startswith(self.name + "."):
+            raise ImportError(f"{self.name} is disabled in this process")
+        return None
+
+
+def block_import(name: str) -> bool:
+    """
+    Make `import <name>` raise ImportError from now on, as if the package were
+    not installed. Unlike `sys.modules[name] = None`, the name stays absent from
+    sys.modules, which is what libraries probing for it (sklearn for pandas)
+    expect. Returns False if it was already imported.
+    """
+    if name in sys.modules:
+        return False
+    sys.meta_path.insert(0, _BlockedImport(name))
+    return True
+
+
+def process_start_time() -> float:
+    """Wall-clock time this process started (Linux /proc), or now if unknown."""
+    try:
+        with open("/proc/self/stat") as fp:
+            start_ticks = int(fp.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as fp:
+            uptime = float(fp.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.process_start = process_start_time()
+        self.phases: list = []
+        self.first_request = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    def since_start(self) -> float:
+        return time.time() - self.process_start
+
+    def mark_first_request(self) -> bool:
+        """Remember when the first request arrived; True only the first time."""
+        if self.first_request is not None:
+            return False
+        self.first_request = self.since_start()
+        return True
+
+    def report(self) -> str:
+        lines = [f"⏱️  Startup ({os.getpid()}): ready {self.since_start():.2f}s after process start"]
+        lines += [f"   {name:<28}{seconds * 1000:>9.1f} ms" for name, seconds in self.phases]
+        return "\n".join(lines)
+
+
+# ─────────────── import-time breakdown ───────────────
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_breakdown(module: str = "app", env: dict = None) -> list:
+    """
+    (module, self_us, cumulative_us, depth) for every import performed by a
+    fresh interpreter running `import <module>`, via `python -X importtime`.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Import-time and boot breakdown of the web app.")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=15, help="slowest packages to list")
+    parser.add_argument("--budget", type=float, help="fail if the import takes longer (seconds)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    # No reload watcher: in lazy mode its background loads would be attributed to the boot imports.
+    rows = import_breakdown(args.module, env={**os.environ, "MODEL_RELOAD_INTERVAL": "0"})
+    wall = time.perf_counter() - start
+
+    by_package: dict = {}
+    for name, self_us, _, _ in rows:
+        top = name.split(".")[0]
+        by_package[top] = by_package.get(top, 0) + self_us
+    total = sum(by_package.values())
+    cumulative = next((cum for name, _, cum, depth in rows if name == args.module and depth == 0), total)
+    print(f"import {args.module}: {cumulative / 1e6:.2f}s, {wall:.2f}s wall including interpreter start")
+    print(f"{'package':<32}{'self ms':>10}{'share':>8}")
+    for name, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:<32}{us / 1000:>10.1f}{us / total:>8.1%}")
+    if args.budget is not None and wall > args.budget:
+        print(f"❌ Boot took {wall:.2f}s, over the {args.budget:.2f}s budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import datetime as dt, json, math, os, threading
+
+
+class ScreeningStats:
+    """
+    Running aggregates over one disease's results log.
+
+    Counts by outcome, per-feature count/mean/variance/min/max (Welford, so
+    each record is folded in once in O(features)), and hourly and daily
+    counts keyed on the records' UTC `ts`, keeping only the newest
+    `hourly_buckets` / `daily_buckets`. Every figure covers the log up to
+    log offset `upto`.
+
+    Records this process appends are folded in as they are written (the
+    store's append listener). Records written by other workers, or before a
+    restart, are picked up by `refresh()`, which reads only the log past
+    `upto`. `checkpoint()` saves the aggregates and `upto` beside the
+    results file; on startup they are loaded from there, so recovering only
+    costs a read of what was written since the last checkpoint. A snapshot
+    costs the same however long the history is.
+    """
+
+    def __init__(self, store, features: list, outcome, hourly_buckets: int = 168, daily_buckets: int = 366):
+        self.store = store
+        self.features = list(features)
+        self.outcome = outcome
+        self.hourly_buckets = hourly_buckets
+        self.daily_buckets = daily_buckets
+        self.checkpoint_file = f"{store.results_file}.stats.json"
+        self._lock = threading.Lock()
+        self._saved_upto = None
+        self._reset()
+        self._load()
+        store.add_listener(self._on_append)
+
+    # ─────────────── state ───────────────
+    def _reset(self) -> None:
+        self.upto = 0
+        self.total = 0
+        self.outcomes: dict = {}
+        # feature → [count, mean, M2, min, max]
+        self.moments: dict = {f: [0, 0.0, 0.0, None, None] for f in self.features}
+        self.hourly: dict = {}
+        self.daily: dict = {}
+        self.first_ts = self.last_ts = None
+
+    def _load(self) -> None:
+        try:
+            with open(self.checkpoint_file, "r", encoding="utf-8") as fp:
+                state = json.load(fp)
+            if state.get("features") != self.features:
+                return  # the disease's features changed; rebuild from the log
+            self.upto = state["upto"]
+            self.total = state["total"]
+            self.outcomes = state["outcomes"]
+            self.moments.update(state["moments"])
+            self.hourly, self.daily = state["hourly"], state["daily"]
+            self.first_ts, self.last_ts = state["first_ts"], state["last_ts"]
+            self._saved_upto = self.upto
+        except (OSError, ValueError, KeyError, TypeError):
+            self._reset()
+
+    def checkpoint(self) -> bool:
+        """Save the aggregates if they moved since the last save; returns whether it wrote."""
+        with self._lock:
+            if self.upto == self._saved_upto:
+                return False
+            state = {"upto": self.upto, "features": self.features, "total": self.total,
+                     "outcomes": self.outcomes, "moments": self.moments, "hourly": self.hourly,
+                     "daily": self.daily, "first_ts": self.first_ts, "last_ts": self.last_ts}
+            data = json.dumps(state)
+            self._saved_upto = self.upto
+        # Every worker checkpoints the same log; any of their files is a consistent state.
+        tmp_path = f"{self.checkpoint_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            fp.write(data)
+        os.replace(tmp_path, self.checkpoint_file)
+        return True
+
+    # ─────────────── folding ───────────────
+    def _bump(self, buckets: dict, key: str, high: bool, keep: int) -> None:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [0, 0]
+            if len(buckets) > keep:
+                del buckets[min(buckets)]
+        bucket[0] += 1
+        bucket[1] += high
+
+    def _fold(self, rec: dict) -> None:
+        outcome = self.outcome(rec)
+        self.total += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        for name, m in self.moments.items():
+            try:
+                x = float(rec.get(name))
+            except (TypeError, ValueError):
+                continue
+            if not math.isfinite(x):
+                continue
+            m[0] += 1
+            delta = x - m[1]
+            m[1] += delta / m[0]
+            m[2] += delta * (x - m[1])
+            m[3] = x if m[3] is None else min(m[3], x)
+            m[4] = x if m[4] is None else max(m[4], x)
+        ts = rec.get("ts")
+        if isinstance(ts, str) and len(ts) >= 13:
+            high = outcome == "high_risk"
+            self._bump(self.hourly, ts[:13], high, self.hourly_buckets)
+            self._bump(self.daily, ts[:10], high, self.daily_buckets)
+            if self.first_ts is None or ts < self.first_ts:
+                self.first_ts = ts
+            if self.last_ts is None or ts > self.last_ts:
+                self.last_ts = ts
+
+    def _on_append(self, recs: list, start: int, end: int) -> None:
+        with self._lock:
+            # Only if nothing unseen lies before them; otherwise refresh() reads them in order.
+            if start == self.upto:
+                for rec in recs:
+                    self._fold(rec)
+                self.upto = end
+
+    def refresh(self) -> int:
+        """Fold in everything appended since `upto` (by any process). Returns the number of records read."""
+        with self._lock:
+            recs, upto = self.store.read_from(self.upto)
+            for rec in recs:
+                self._fold(rec)
+            self.upto = upto
+            return len(recs)
+
+    # ─────────────── reads ───────────────
+    def snapshot(self, now=None) -> dict:
+        """JSON-ready view of the aggregates, including the last 24 hours and 7 days."""
+        now = now or dt.datetime.now(dt.timezone.utc)
+        day_floor = (now - dt.timedelta(days=6)).strftime("%Y-%m-%d")
+        hour_floor = (now - dt.timedelta(hours=23)).strftime("%Y-%m-%dT%H")
+        with self._lock:
+            features = {}
+            for name, (n, mean, m2, lo, hi) in self.moments.items():
+                variance = m2 / (n - 1) if n > 1 else 0.0
+                features[name] = {"count": n, "mean": mean if n else None, "variance": variance if n else None,
+                                  "std": math.sqrt(variance) if n else None, "min": lo, "max": hi}
+            hourly = [{"hour": k, "count": c, "high_risk": h} for k, (c, h) in sorted(self.hourly.items())]
+            daily = [{"day": k, "count": c, "high_risk": h} for k, (c, h) in sorted(self.daily.items())]
+            return {
+                "total": self.total,
+                "outcomes": dict(self.outcomes),
+                "features": features,
+                "last_24_hours": {"count": sum(b["count"] for b in hourly if b["hour"] >= hour_floor),
+                                  "high_risk": sum(b["high_risk"] for b in hourly if b["hour"] >= hour_floor)},
+                "last_7_days": {"count": sum(b["count"] for b in daily if b["day"] >= day_floor),
+                                "high_risk": sum(b["high_risk"] for b in daily if b["day"] >= day_floor)},
+                "hourly": hourly,
+                "daily": daily,
+                "first_ts": self.first_ts,
+                "last_ts": self.last_ts,
+                "log_offset": self.upto,
+            }
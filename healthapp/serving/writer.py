@@ -0,0 +1,128 @@
+import queue, threading, time
+
+
+class RecordWriter:
+    """
+    Write-behind buffer in front of the per-disease ResultsStores.
+
+    Request threads only enqueue; one background thread per worker drains the
+    bounded queue and group-commits everything that arrived within
+    `flush_interval` seconds (or `flush_size` records) with one append per
+    disease, optionally fsync'ing each batch. Records stay visible through
+    `pending()` until they are on disk so a redirect to /results served by the
+    same worker always finds them. If the queue is full the caller writes
+    synchronously instead of dropping data. A batch whose append fails is
+    retried `max_attempts` times with a doubling delay; after that it is
+    dropped, printed, taken out of `pending()` and reported to `on_drop(disease,
+    count)`.
+    """
+
+    def __init__(self, stores: dict, max_queue: int = 10000, flush_interval: float = 0.05,
+                 flush_size: int = 256, fsync: bool = False, max_attempts: int = 3,
+                 retry_delay: float = 0.1, on_drop=None):
+        self.stores = stores
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.fsync = fsync
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.on_drop = on_drop
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending: dict = {}
+        self._pending_lock = threading.Lock()
+        self._thread = None
+
+    # ─────────────── request side ───────────────
+    def submit(self, disease: str, recs: list) -> None:
+        """Queue records for `disease`; falls back to a direct write when full."""
+        with self._pending_lock:
+            for rec in recs:
+                self._pending[rec["id"]] = rec
+        try:
+            if self._thread is None:
+                raise queue.Full
+            self._queue.put_nowait((disease, recs))
+        except queue.Full:
+            self._commit({disease: list(recs)})
+
+    def pending(self, rec_id: str):
+        """A record that was submitted but is not on disk yet, or None."""
+        return self._pending.get(rec_id)
+
+    # ─────────────── background side ───────────────
+    def _append(self, disease: str, recs: list) -> bool:
+        """Append with bounded retries; False once the batch has been given up on."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.stores[disease].append_many(recs, fsync=self.fsync)
+                return True
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    print(f"❌ Dropping {len(recs)} {disease} record(s) after {attempt} failed attempt(s): {e}")
+                    return False
+                print(f"❌ Couldn't persist {len(recs)} {disease} record(s) "
+                                f"(attempt {attempt}/{self.max_attempts}), retrying: {e}")
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    def _commit(self, batch: dict) -> None:
+        for disease, recs in batch.items():
+            if not self._append(disease, recs) and self.on_drop is not None:
+                self.on_drop(disease, len(recs))
+            # Written or given up on: either way the ids must stop resolving from memory.
+            with self._pending_lock:
+                for rec in recs:
+                    self._pending.pop(rec["id"], None)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch, count, done = {}, 0, 1
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stopping = True
+                else:
+                    disease, recs = item
+                    batch.setdefault(disease, []).extend(recs)
+                    count += len(recs)
+                if stopping or count >= self.flush_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                done += 1
+            self._commit(batch)
+            for _ in range(done):
+                self._queue.task_done()
+
+    def start(self) -> "RecordWriter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="record-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stop(self) -> None:
+        """Drain the queue and stop the writer thread (called at shutdown)."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        # Anything that raced in after the sentinel is written directly.
+        leftovers = {}
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftovers.setdefault(item[0], []).extend(item[1])
+        self._commit(leftovers)
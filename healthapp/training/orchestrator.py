@@ -0,0 +1,239 @@
+"""
+Train every disease's pipeline concurrently.
+
+Each disease runs ingestion → validation → transformation → training; the
+twenty stages form a DAG (a stage waits only for the one before it in its
+own disease) and run on a shared pool of `TRAIN_PIPELINE_WORKERS` slots, so
+one disease's transformation overlaps another's training instead of the
+five pipelines adding up. Every stage runs in its own process:
+
+- a stage that raises, runs out of memory or dies outright fails only its
+  own disease, whose later stages are skipped; the other diseases carry on;
+- `TRAIN_CPU_LIMIT` cores are shared between the training stages still to
+  run (each gets its slice as search workers, see healthapp/training/search.py);
+- `TRAIN_STAGE_MEMORY_MB` caps each stage process's address space.
+
+Stages pass their artifact dataclasses to the next stage, exactly as
+healthapp/main.py used to. A stage whose inputs, code and config are the
+same as in an earlier run reuses that run's artifacts instead of recomputing
+them (healthapp/training/stage_cache.py). A timing summary is printed at the end:
+
+    python -m healthapp.training.orchestrator                    # every disease
+    python -m healthapp.training.orchestrator --diseases Heart Liver --workers 2
+"""
+import argparse, datetime as dt, hashlib, importlib, multiprocessing, os, sys, time, traceback
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+
+from healthapp.logging.logger import logging
+from healthapp.training import stage_cache
+from healthapp.training.search import SEARCH_WORKERS
+from healthapp.training.stage_cache import StageCache
+
+try:
+    import resource
+except ImportError:  # Windows: no per-process memory cap
+    resource = None
+
+DISEASES = ("Diabetes", "Kidney", "Liver", "Cancer", "Heart")
+STAGES = ("ingestion", "validation", "transformation", "training")
+PIPELINE_WORKERS = int(os.getenv("TRAIN_PIPELINE_WORKERS", "0")) or min(len(DISEASES), os.cpu_count() or 1)
+CPU_LIMIT = int(os.getenv("TRAIN_CPU_LIMIT", "0")) or SEARCH_WORKERS
+STAGE_MEMORY_MB = int(os.getenv("TRAIN_STAGE_MEMORY_MB", "0"))
+
+
+def _compute_stage(disease: str, stage: str, pipeline_config, config, upstream, dataframe=None):
+    if stage == "ingestion":
+        module = importlib.import_module(f"healthapp.{disease}.components.data_ingestion")
+        ingestion = module.DataIngestion(config.DataIngestionConfig(pipeline_config))
+        # The same steps as initiate_data_ingestion, on the frame already fetched to compute the key.
+        dataframe = ingestion.export_data_into_feature_store(dataframe)
+        ingestion.split_data_as_train_test(dataframe)
+        return module.DataIngestionArtifact(trained_file_path=ingestion.data_ingestion_config.training_file_path,
+                                            test_file_path=ingestion.data_ingestion_config.testing_file_path)
+    if stage == "validation":
+        module = importlib.import_module(f"healthapp.{disease}.components.data_validation")
+        return module.DataValidation(upstream, config.DataValidationConfig(pipeline_config)).initiate_data_validation()
+    if stage == "transformation":
+        module = importlib.import_module(f"healthapp.{disease}.components.data_transformation")
+        return module.DataTransformation(upstream, config.DataTransformationConfig(pipeline_config)).initiate_data_transformation()
+    if stage == "training":
+        module = importlib.import_module(f"healthapp.{disease}.components.model_trainer")
+        return module.ModelTrainer(config.ModelTrainerConfig(pipeline_config), upstream).initiate_model_trainer()
+    raise ValueError(f"Unknown pipeline stage {stage!r}")
+
+
+def run_stage(disease: str, stage: str, timestamp: dt.datetime, upstream):
+    """
+    Run one stage of `disease`'s pipeline in this process; returns (artifact,
+    reused). A stage whose inputs, code and config match an earlier run
+    returns that run's artifact instead (see healthapp/training/stage_cache.py).
+    """
+    config = importlib.import_module(f"healthapp.{disease}.entity.config_entity")
+    pipeline_config = config.TrainingPipelineConfig(timestamp)
+    cache = StageCache(disease)
+    dataframe = data_digest = None
+    if stage == "ingestion":
+        # The source is MongoDB, so the data has to be fetched to know whether it changed.
+        module = importlib.import_module(f"healthapp.{disease}.components.data_ingestion")
+        dataframe = module.DataIngestion(config.DataIngestionConfig(pipeline_config)).export_collection_as_dataframe()
+        data_digest = hashlib.sha256(dataframe.to_csv(index=False).encode("utf-8")).hexdigest()
+    key = cache.key(stage, upstream, data_digest)
+    if stage_cache.CACHE_ENABLED:
+        artifact = cache.lookup(stage, key)
+        if artifact is not None:
+            logging.info(f"{disease} {stage}: inputs unchanged, reusing {artifact}")
+            return artifact, True
+    artifact = _compute_stage(disease, stage, pipeline_config, config, upstream, dataframe)
+    cache.store(stage, key, artifact)
+    return artifact, False
+
+
+def _stage_process(conn, runner, disease: str, stage: str, timestamp, upstream, search_workers: int,
+                   memory_mb: int, cache: bool) -> None:
+    """Child side: apply the limits, run the stage, send ("ok", (artifact, reused)) or ("error", traceback)."""
+    try:
+        if memory_mb and resource is not None:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        from healthapp.training import search
+        search.SEARCH_WORKERS = search_workers
+        stage_cache.CACHE_ENABLED = cache
+        conn.send(("ok", runner(disease, stage, timestamp, upstream)))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+@dataclass
+class StageRun:
+    disease: str
+    stage: str
+    status: str = "pending"          # pending, running, ok, failed, skipped
+    seconds: float = 0.0
+    reused: bool = False             # an earlier run's artifact, inputs unchanged
+    error: str = ""
+
+
+def _cell(run: StageRun) -> str:
+    if run.status not in ("ok", "failed"):
+        return run.status
+    return f"{run.seconds:.1f}s reused" if run.reused else f"{run.seconds:.1f}s"
+
+
+class Orchestrator:
+    """Schedules the diseases' stage DAG on `workers` process slots; `run()` returns disease → StageRun list."""
+
+    def __init__(self, diseases=DISEASES, workers: int = PIPELINE_WORKERS, cpu_limit: int = CPU_LIMIT,
+                 memory_mb: int = STAGE_MEMORY_MB, cache: bool = stage_cache.CACHE_ENABLED, runner=run_stage):
+        self.diseases = list(diseases)
+        self.workers = max(1, workers)
+        self.cpu_limit = max(1, cpu_limit)
+        self.memory_mb = memory_mb
+        self.cache = cache
+        self.runner = runner
+        self.runs = {d: [StageRun(d, s) for s in STAGES] for d in self.diseases}
+        self.artifacts: dict = {}
+        self.wall_seconds = 0.0
+
+    def _ready(self) -> list:
+        ready = []
+        for disease, runs in self.runs.items():
+            for i, run in enumerate(runs):
+                if run.status == "pending" and (i == 0 or runs[i - 1].status == "ok"):
+                    ready.append((disease, i))
+        return ready
+
+    def _search_workers(self) -> int:
+        # Split the cores between the training stages that can still overlap with this one.
+        training = sum(runs[-1].status in ("pending", "running") for runs in self.runs.values())
+        return max(1, self.cpu_limit // max(1, min(self.workers, training)))
+
+    def _fail(self, disease: str, i: int, error: str) -> None:
+        runs = self.runs[disease]
+        runs[i].status, runs[i].error = "failed", error
+        for run in runs[i + 1:]:
+            run.status = "skipped"
+
+    def run(self, timestamp: dt.datetime = None) -> dict:
+        timestamp = timestamp or dt.datetime.now()
+        # forkserver/spawn children don't inherit this process's threads or imported pipelines.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        ctx = multiprocessing.get_context(method)
+        if method == "forkserver":
+            # Stage processes fork with numpy and sklearn already imported instead of paying for it each time.
+            ctx.set_forkserver_preload(["healthapp.training.search"])
+        running = {}  # connection → (process, disease, stage index, start)
+        start = time.perf_counter()
+        while True:
+            for disease, i in self._ready()[:self.workers - len(running)]:
+                run = self.runs[disease][i]
+                upstream = self.artifacts.get((disease, i - 1))
+                receive, send = ctx.Pipe(duplex=False)
+                process = ctx.Process(target=_stage_process, name=f"{disease}-{run.stage}",
+                                      args=(send, self.runner, disease, run.stage, timestamp, upstream,
+                                            self._search_workers(), self.memory_mb, self.cache))
+                run.status = "running"
+                process.start()
+                send.close()
+                running[receive] = (process, disease, i, time.perf_counter())
+                print(f"▶ {disease} {run.stage}")
+            if not running:
+                break
+            for conn in wait(list(running)):
+                process, disease, i, started = running.pop(conn)
+                try:
+                    outcome, payload = conn.recv()
+                except EOFError:  # died without reporting: killed, segfault, os._exit
+                    outcome, payload = "error", None
+                conn.close()
+                process.join()
+                run = self.runs[disease][i]
+                run.seconds = time.perf_counter() - started
+                if outcome == "ok":
+                    run.status = "ok"
+                    self.artifacts[(disease, i)], run.reused = payload
+                    print(f"✔ {disease} {run.stage} ({run.seconds:.1f}s{', reused' if run.reused else ''})")
+                else:
+                    self._fail(disease, i, payload or f"stage process exited with code {process.exitcode}")
+                    print(f"✘ {disease} {run.stage} failed; skipping the rest of {disease}:\n{run.error}")
+        self.wall_seconds = time.perf_counter() - start
+        return self.runs
+
+    def summary(self) -> str:
+        lines = [f"{'disease':<10}" + "".join(f"{s:>16}" for s in STAGES) + f"{'total':>10}  status"]
+        stage_seconds = 0.0
+        for disease, runs in self.runs.items():
+            cells = "".join(f"{_cell(r):>16}" for r in runs)
+            total = sum(r.seconds for r in runs)
+            stage_seconds += total
+            failed = next((r.stage for r in runs if r.status == "failed"), None)
+            lines.append(f"{disease:<10}{cells}{total:>9.1f}s  {'failed at ' + failed if failed else 'ok'}")
+        lines.append(f"\nWall time {self.wall_seconds:.1f}s for {stage_seconds:.1f}s of stages "
+                     f"({self.workers} slots, {self.cpu_limit} CPUs)")
+        return "\n".join(lines)
+
+    @property
+    def failed(self) -> list:
+        return [d for d, runs in self.runs.items() if any(r.status == "failed" for r in runs)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--diseases", nargs="+", default=list(DISEASES), choices=DISEASES)
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS, help="stages run at once")
+    parser.add_argument("--cpus", type=int, default=CPU_LIMIT, help="cores shared by the training stages")
+    parser.add_argument("--memory-mb", type=int, default=STAGE_MEMORY_MB, help="address-space cap per stage (0: none)")
+    parser.add_argument("--no-cache", action="store_true", help="recompute every stage even if its inputs are unchanged")
+    args = parser.parse_args(argv)
+
+    orchestrator = Orchestrator(args.diseases, args.workers, args.cpus, args.memory_mb,
+                                cache=stage_cache.CACHE_ENABLED and not args.no_cache)
+    orchestrator.run()
+    print(orchestrator.summary())
+    return 1 if orchestrator.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
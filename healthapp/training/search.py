@@ -0,0 +1,361 @@
+"""
+Parallel hyperparameter search over several estimators at once.
+
+`GridSearchCV` per model, one model after another, keeps one core busy. Here
+every (candidate, fold) fit of every model is an independent task on one
+process pool, so the large SVC and gradient-boosting grids overlap with each
+other and with the small ones. The training matrix is written once to a
+temporary .npy file that every worker memory-maps, so a task carries only a
+model name, a parameter set and a fold number.
+
+By default a model's grid is searched exhaustively, with results identical
+to `GridSearchCV(model, grid, cv=cv)` (same folds, same scorer, same
+tie-breaking) whatever the worker count: scores are stored by task index,
+never by completion order, and estimators with an unset `random_state` get
+`random_state` before the search. A grid can name another strategy under
+the `"_search"` key instead:
+
+    {"C": [...], "kernel": [...], "_search": {"strategy": "halving", "resource": "n_samples"}}
+    {"learning_rate": [...], "n_estimators": [8, 256], "_search": {"strategy": "halving", "resource": "n_estimators"}}
+    {"C": [...], "kernel": [...], "_search": {"strategy": "random", "max_fits": 60}}   # or "max_seconds": 30
+
+`halving` is successive halving: every candidate is scored with a small
+resource (training rows, or an integer parameter such as n_estimators), the
+best 1/`factor` go on with `factor` times as much, and the last round always
+uses the full resource. Since every round costs a fit per survivor, halving
+the whole grid takes more fits than searching it; it starts from
+`n_candidates` sampled from the grid, by default as many as keep its fits
+under half of the exhaustive search's. `random` scores a sample of the grid: `max_fits`
+fits (or `n_iter` candidates), or as many as fit in `max_seconds`, the one
+budget whose result depends on machine speed.
+
+    results = grid_search(models, params, X_train, y_train, cv=3, n_jobs=8)
+    results["SVC"].best_params, results["SVC"].best_score
+"""
+import math, multiprocessing, os, tempfile, time, warnings
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import numpy as np
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, ParameterSampler, check_cv
+
+# Worker count (default: every core) and the seed given to estimators that have none.
+SEARCH_WORKERS = int(os.getenv("TRAIN_SEARCH_WORKERS", "0")) or os.cpu_count() or 1
+SEARCH_RANDOM_STATE = int(os.getenv("TRAIN_RANDOM_STATE", "42"))
+# Metric models are selected on (any sklearn scorer name); accuracy is GridSearchCV's default for classifiers.
+SELECTION_METRIC = os.getenv("TRAIN_SELECTION_METRIC", "accuracy")
+STRATEGY_KEY = "_search"
+
+
+@dataclass
+class SearchResult:
+    """One estimator's search: every scored candidate's fold scores plus the winner."""
+    name: str
+    strategy: str
+    candidates: list                 # parameter dicts that were scored
+    split_scores: np.ndarray         # (n_candidates, n_folds) test-fold scores, at the largest resource each reached
+    fit_times: np.ndarray            # (n_candidates, n_folds) seconds, summed over rounds
+    best_index: int
+    n_fits: int = 0
+    fixed_params: dict = field(default_factory=dict)  # added to the winner for the refit (halving's full resource)
+    best_estimator: object = None    # refit on all the data (refit=True)
+    refit_time: float = 0.0
+
+    @property
+    def mean_scores(self) -> np.ndarray:
+        return self.split_scores.mean(axis=1)
+
+    @property
+    def best_params(self) -> dict:
+        return {**self.candidates[self.best_index], **self.fixed_params}
+
+    @property
+    def best_score(self) -> float:
+        return float(self.mean_scores[self.best_index])
+
+    @property
+    def fit_seconds(self) -> float:
+        """Total fit time spent on this estimator (all folds, plus the refit)."""
+        return float(self.fit_times.sum()) + self.refit_time
+
+
+# ─────────────── strategies ───────────────
+def _ranked(scores: np.ndarray, indices: list) -> list:
+    """`indices`, best mean fold score first; NaN last and ties to the earlier candidate, as in GridSearchCV."""
+    rows = scores[indices]
+    means = np.where(np.isnan(rows).any(axis=1), -np.inf, rows.mean(axis=1))
+    return [indices[i] for i in np.argsort(-means, kind="stable")]
+
+
+class _Plan:
+    """
+    The rounds of one estimator's search; the base class is exhaustive (one
+    round, every candidate). `next_round()` returns (candidate index, extra
+    params, training rows or None) to score on every fold, or [] once done;
+    the driver fills `scores` and then calls `end_round()`.
+    """
+    strategy = "exhaustive"
+
+    def __init__(self, candidates: list, n_folds: int):
+        self.candidates = candidates
+        self.scores = np.full((len(candidates), n_folds), np.nan)
+        self.fit_times = np.zeros((len(candidates), n_folds))
+        self.n_fits = 0
+        self.fixed_params: dict = {}
+        self.scored: list = []
+        self.best_index = None
+        self._pending = list(range(len(candidates)))
+
+    def next_round(self) -> list:
+        round_, self._pending = self._pending, []
+        return [(i, {}, None) for i in round_]
+
+    def end_round(self, round_: list) -> None:
+        self.scored.extend(i for i, _, _ in round_)
+        self.best_index = _ranked(self.scores, self.scored)[0]
+
+
+class _Random(_Plan):
+    strategy = "random"
+
+    def __init__(self, grid: dict, n_folds: int, spec: dict, n_jobs: int, random_state: int):
+        budget = spec.get("max_fits")
+        n_iter = spec.get("n_iter") or (max(1, budget // n_folds) if budget else None)
+        self.deadline = time.monotonic() + spec["max_seconds"] if spec.get("max_seconds") else None
+        size = len(ParameterGrid(grid)) if all(isinstance(v, list) for v in grid.values()) else None
+        if n_iter is None:
+            n_iter = size if self.deadline is not None and size is not None else 10
+        n_iter = min(n_iter, size) if size is not None else n_iter
+        super().__init__(list(ParameterSampler(grid, n_iter, random_state=random_state)), n_folds)
+        # Under a time budget, hand out about a pool's worth of fits per round and stop at the deadline.
+        self.batch = max(1, n_jobs // n_folds) if self.deadline is not None else len(self.candidates)
+
+    def next_round(self) -> list:
+        if self.deadline is not None and self.scored and time.monotonic() >= self.deadline:
+            self._pending = []
+        round_, self._pending = self._pending[:self.batch], self._pending[self.batch:]
+        return [(i, {}, None) for i in round_]
+
+
+class _Halving(_Plan):
+    strategy = "halving"
+
+    def __init__(self, grid: dict, n_folds: int, spec: dict, estimator, min_train: int, n_classes: int,
+                 random_state: int):
+        self.resource = spec.get("resource", "n_samples")
+        self.factor = spec.get("factor", 3)
+        grid = dict(grid)
+        budget = len(ParameterGrid(grid)) // 2  # candidate-rounds: half the exhaustive fits
+        if self.resource == "n_samples":
+            self.max_resources = min_train
+            smallest = 2 * n_folds * max(n_classes, 1)
+        else:
+            values = grid.pop(self.resource, None)
+            self.max_resources = spec.get("max_resources") or (max(values) if values else estimator.get_params()[self.resource])
+            smallest = 1
+        size = len(ParameterGrid(grid))
+        n_candidates = spec.get("n_candidates") or max(1, size)
+        while n_candidates > 1 and not spec.get("n_candidates") and self._rounds_cost(n_candidates) > budget:
+            n_candidates -= 1
+        if n_candidates < size:
+            candidates = list(ParameterSampler(grid, n_candidates, random_state=random_state))
+        else:
+            candidates = list(ParameterGrid(grid))
+        super().__init__(candidates, n_folds)
+        # As HalvingGridSearchCV(min_resources="exhaust"): start low enough that the last
+        # round with more than one candidate left uses everything.
+        rounds = 1
+        while self.factor ** rounds < len(self.candidates):
+            rounds += 1
+        self.level = spec.get("min_resources") or max(smallest, self.max_resources // self.factor ** (rounds - 1))
+        self.level = min(self.level, self.max_resources)
+        if self.resource != "n_samples":
+            self.fixed_params = {self.resource: self.max_resources}
+
+    def _rounds_cost(self, n: int) -> int:
+        """Candidate-rounds (fits per fold) that halving `n` candidates takes."""
+        cost = n
+        while n > 1:
+            n = math.ceil(n / self.factor)
+            cost += n
+        return cost
+
+    def next_round(self) -> list:
+        if not self._pending:
+            return []
+        if self.resource == "n_samples":
+            extra, rows = {}, (self.level if self.level < self.max_resources else None)
+        else:
+            extra, rows = {self.resource: self.level}, None
+        return [(i, extra, rows) for i in self._pending]
+
+    def end_round(self, round_: list) -> None:
+        alive = _ranked(self.scores, [i for i, _, _ in round_])
+        self.scored = sorted(set(self.scored) | set(alive))
+        self.best_index = alive[0]
+        if self.level >= self.max_resources:
+            self._pending = []
+            return
+        keep = math.ceil(len(alive) / self.factor)
+        self._pending = sorted(alive[:keep])
+        self.level = self.max_resources if keep == 1 else min(self.level * self.factor, self.max_resources)
+
+
+def _plan(estimator, grid: dict, n_folds: int, n_jobs: int, random_state: int, min_train: int, n_classes: int) -> _Plan:
+    grid = dict(grid)
+    spec = grid.pop(STRATEGY_KEY, None) or {}
+    strategy = spec.get("strategy", "exhaustive")
+    if strategy == "exhaustive":
+        return _Plan(list(ParameterGrid(grid)), n_folds)
+    if strategy == "random":
+        return _Random(grid, n_folds, spec, n_jobs, random_state)
+    if strategy == "halving":
+        return _Halving(grid, n_folds, spec, estimator, min_train, n_classes, random_state)
+    raise ValueError(f"Unknown search strategy {strategy!r}; use exhaustive, random or halving")
+
+
+# ─────────────── worker side ───────────────
+_X = _y = _folds = _estimators = _scoring = None
+
+
+def _init_worker(x_path: str, y_path: str, folds: dict, estimators: dict, scoring) -> None:
+    global _X, _y, _folds, _estimators, _scoring
+    _X = np.load(x_path, mmap_mode="r")
+    _y = np.load(y_path, mmap_mode="r")
+    _folds, _estimators, _scoring = folds, estimators, scoring
+    warnings.filterwarnings("ignore")
+
+
+def _fit_and_score(name: str, params: dict, fold: int, n_samples: int = None):
+    """
+    Fit one candidate on one training fold, or on `n_samples` of its rows
+    (a fixed random subset); (score, fit seconds). A failed fit scores NaN,
+    as in GridSearchCV.
+    """
+    estimator = clone(_estimators[name]).set_params(**params)
+    train, test, order = _folds[is_classifier(estimator)][fold]
+    if n_samples is not None:
+        train = np.sort(train[order[:n_samples]])
+    start = time.perf_counter()
+    try:
+        estimator.fit(_X[train], _y[train])
+    except Exception:
+        return np.nan, time.perf_counter() - start
+    fit_time = time.perf_counter() - start
+    return check_scoring(estimator, scoring=_scoring)(estimator, _X[test], _y[test]), fit_time
+
+
+def _refit(name: str, params: dict):
+    estimator = clone(_estimators[name]).set_params(**params)
+    start = time.perf_counter()
+    estimator.fit(np.asarray(_X), np.asarray(_y))
+    return estimator, time.perf_counter() - start
+
+
+# ─────────────── driver ───────────────
+def _seeded(estimator, random_state: int):
+    if "random_state" in estimator.get_params() and estimator.get_params()["random_state"] is None:
+        estimator.set_params(random_state=random_state)
+    return estimator
+
+
+def grid_search(estimators: dict, param_grids: dict, X, y, cv=3, scoring=None, n_jobs: int = None,
+                refit: bool = True, random_state: int = SEARCH_RANDOM_STATE) -> dict:
+    """
+    Search `param_grids[name]` for every estimator in `estimators` (name →
+    unfitted estimator, seeded in place if it has no `random_state`) with
+    the strategy its grid names, exhaustive by default, and return name →
+    SearchResult. `scoring` is anything `sklearn.metrics.check_scoring`
+    accepts (None: the estimator's `score`). With `refit`, each winner is
+    refit on all of X/y, also on the pool. `n_jobs` defaults to
+    TRAIN_SEARCH_WORKERS; 1 runs everything in-process.
+    """
+    X, y = np.ascontiguousarray(X), np.ascontiguousarray(y)
+    for estimator in estimators.values():
+        _seeded(estimator, random_state)
+    rng = np.random.RandomState(random_state)
+    folds = {}
+    for estimator in estimators.values():
+        kind = is_classifier(estimator)
+        if kind not in folds:
+            # Each fold keeps a fixed shuffle of its training rows for searches that subsample them.
+            folds[kind] = [(train, test, rng.permutation(len(train)))
+                           for train, test in check_cv(cv, y, classifier=kind).split(X, y)]
+    n_folds = len(next(iter(folds.values())))
+    n_jobs = max(1, n_jobs or SEARCH_WORKERS)
+    plans = {name: _plan(estimator, param_grids.get(name, {}), n_folds, n_jobs, random_state,
+                         min(len(train) for train, _, _ in folds[is_classifier(estimator)]), len(np.unique(y)))
+             for name, estimator in estimators.items()}
+    n_jobs = min(n_jobs, sum(len(plan.candidates) for plan in plans.values()) * n_folds)
+
+    with tempfile.TemporaryDirectory(prefix="search-") as tmp:
+        if n_jobs == 1:
+            _init_worker_inline(X, y, folds, estimators, scoring)
+            pool = None
+        else:
+            x_path, y_path = os.path.join(tmp, "X.npy"), os.path.join(tmp, "y.npy")
+            np.save(x_path, X)
+            np.save(y_path, y)
+            # forkserver/spawn workers don't inherit the trainer's threads (MLflow, DagsHub).
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context(method),
+                                       initializer=_init_worker,
+                                       initargs=(x_path, y_path, folds, estimators, scoring))
+        try:
+            submit = _run_inline if pool is None else pool.submit
+            pending, rounds, outstanding = {}, {}, {}
+
+            def launch(name: str) -> None:
+                # Each estimator starts its next round as soon as its own fits are in.
+                plan = plans[name]
+                rounds[name] = plan.next_round()
+                outstanding[name] = len(rounds[name]) * n_folds
+                for i, extra, n_samples in rounds[name]:
+                    params = {**plan.candidates[i], **extra}
+                    for fold in range(n_folds):
+                        pending[submit(_fit_and_score, name, params, fold, n_samples)] = (name, i, fold)
+
+            for name in plans:
+                launch(name)
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, i, fold = pending.pop(future)
+                    plan = plans[name]
+                    plan.scores[i, fold], fit_time = future.result()
+                    plan.fit_times[i, fold] += fit_time
+                    plan.n_fits += 1
+                    outstanding[name] -= 1
+                    if outstanding[name] == 0:
+                        plan.end_round(rounds[name])
+                        launch(name)
+
+            results = {}
+            for name, plan in plans.items():
+                results[name] = SearchResult(name, plan.strategy, [plan.candidates[i] for i in plan.scored],
+                                             plan.scores[plan.scored], plan.fit_times[plan.scored],
+                                             plan.scored.index(plan.best_index), plan.n_fits, plan.fixed_params)
+            if refit:
+                refits = {name: submit(_refit, name, r.best_params) for name, r in results.items()}
+                for name, future in refits.items():
+                    results[name].best_estimator, results[name].refit_time = future.result()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            else:
+                _init_worker_inline(None, None, None, None, None)
+    return results
+
+
+def _run_inline(fn, *args) -> Future:
+    """Run `fn` now and return it as a finished Future, for the in-process path."""
+    future = Future()
+    future.set_result(fn(*args))
+    return future
+
+
+def _init_worker_inline(X, y, folds, estimators, scoring) -> None:
+    global _X, _y, _folds, _estimators, _scoring
+    _X, _y, _folds, _estimators, _scoring = X, y, folds, estimators, scoring
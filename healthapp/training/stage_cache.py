@@ -0,0 +1,120 @@
+"""
+Content-hash memoization of pipeline stages.
+
+A stage's key hashes everything its output depends on: the disease and
+stage, the source of the stage's component and of the disease's constants,
+config entities, utils and schema, and the content of its inputs (the
+upstream artifact's files, or for ingestion the data fetched from MongoDB;
+for training also the search settings). When a run finds an entry for the
+same key whose files are all still there and unchanged (including what the
+stage wrote to `final_models/`, which later runs overwrite), the stage
+returns that earlier run's artifact instead of recomputing it, and because
+the artifact points at the same files the next stage's key matches too.
+
+Entries are pickles in `<ARTIFACT_DIR>/stage_cache/<stage>-<key>.pkl`, each
+written atomically, so concurrent runs at worst both compute a stage.
+`TRAIN_STAGE_CACHE=0` turns reuse off (results are still recorded).
+"""
+import dataclasses, glob, hashlib, importlib, json, os, pickle
+
+CACHE_ENABLED = os.getenv("TRAIN_STAGE_CACHE", "1") != "0"
+CACHE_VERSION = 1
+COMPONENTS = {"ingestion": "data_ingestion", "validation": "data_validation",
+              "transformation": "data_transformation", "training": "model_trainer"}
+# Shared code and settings whose changes alter what transformation and training produce.
+TRANSFORMATION_SOURCES = ("healthapp/inference/preprocessor.py", "healthapp/inference/imputer.py")
+TRAINING_SOURCES = ("healthapp/training/search.py", "healthapp/inference/trees.py", "healthapp/inference/bundle.py")
+TRAINING_ENV = ("TRAIN_RANDOM_STATE", "TRAIN_SELECTION_METRIC")
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_files(artifact) -> list:
+    """Every existing file an artifact dataclass (or one nested in it) points at, in field order."""
+    def walk(value):
+        if isinstance(value, dict):
+            for item in value.values():
+                yield from walk(item)
+        elif isinstance(value, str) and os.path.isfile(value):
+            yield value
+    return list(dict.fromkeys(walk(dataclasses.asdict(artifact)))) if dataclasses.is_dataclass(artifact) else []
+
+
+class StageCache:
+    """The memoized stages of one disease's pipeline."""
+
+    def __init__(self, disease: str):
+        self.disease = disease
+        self.constants = importlib.import_module(f"healthapp.{disease}.constant.training_pipeline")
+        self.cache_dir = os.path.join(self.constants.ARTIFACT_DIR, "stage_cache")
+
+    def sources(self, stage: str) -> list:
+        package = os.path.join("healthapp", self.disease)
+        paths = [os.path.join(package, "components", f"{COMPONENTS[stage]}.py"),
+                 os.path.join(package, "constant", "training_pipeline", "__init__.py"),
+                 os.path.join(package, "entity", "config_entity.py"),
+                 self.constants.SCHEMA_FILE_PATH]
+        paths += sorted(glob.glob(os.path.join(package, "utils", "**", "*.py"), recursive=True))
+        if stage == "transformation":
+            paths += TRANSFORMATION_SOURCES
+        if stage == "training":
+            paths += TRAINING_SOURCES
+        return [p for p in paths if os.path.isfile(p)]
+
+    def key(self, stage: str, upstream=None, data_digest: str = None) -> str:
+        """Hash of the stage's code, config and inputs."""
+        parts = {"version": CACHE_VERSION, "disease": self.disease, "stage": stage,
+                 "sources": {p: file_digest(p) for p in self.sources(stage)},
+                 # By content only: identical inputs in another run's directory give the same key.
+                 "inputs": [file_digest(p) for p in artifact_files(upstream)],
+                 "data": data_digest}
+        if stage == "training":
+            parts["env"] = {name: os.getenv(name) for name in TRAINING_ENV}
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{stage}-{key[:32]}.pkl")
+
+    def outputs(self, stage: str) -> list:
+        """
+        Files a stage writes outside its artifact: transformation's (compiled)
+        preprocessor and all of training's final_models/ pickles.
+        """
+        pattern = {"transformation": "*preprocessor.pkl", "training": "*.pkl"}.get(stage)
+        if pattern is None:
+            return []
+        return sorted(glob.glob(os.path.join("healthapp", self.disease, "final_models", pattern)))
+
+    def lookup(self, stage: str, key: str):
+        """The artifact stored under `key` if every file it recorded is unchanged, else None."""
+        try:
+            with open(self._path(stage, key), "rb") as fp:
+                entry = pickle.load(fp)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        if entry.get("key") != key:
+            return None
+        try:
+            if any(file_digest(path) != digest for path, digest in entry["files"].items()):
+                return None
+        except OSError:
+            return None
+        # final_models/ gained files since; reusing this run would leave them out of step.
+        if set(self.outputs(stage)) - set(entry["files"]):
+            return None
+        return entry["artifact"]
+
+    def store(self, stage: str, key: str, artifact) -> None:
+        files = {path: file_digest(path) for path in artifact_files(artifact) + self.outputs(stage)}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(stage, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fp:
+            pickle.dump({"key": key, "stage": stage, "artifact": artifact, "files": files}, fp)
+        os.replace(tmp_path, path)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.impute import KNNImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from healthapp.inference.preprocessor import CompiledPreprocessor
+
+FEATURES = ["age", "bp", "glucose", "bmi", "cholesterol", "insulin"]
+
+
+def _fit(with_mean=True, with_std=True, clip=False, seed=0):
+    rng = np.random.RandomState(seed)
+    train = rng.normal(50, 15, size=(300, len(FEATURES)))
+    train[rng.rand(*train.shape) < 0.02] = np.nan
+    pipeline = Pipeline([("imputer", KNNImputer(n_neighbors=3)),
+                         ("scaler", StandardScaler(with_mean=with_mean, with_std=with_std)),
+                         ("normalizer", MinMaxScaler(clip=clip))])
+    pipeline.fit(pd.DataFrame(train, columns=FEATURES))
+    # Wider than the training data so that clip=True has something to clip.
+    X = rng.normal(50, 30, size=(400, len(FEATURES)))
+    return pipeline, X
+
+
+def _with_nans(X, seed=1):
+    X = X.copy()
+    rng = np.random.RandomState(seed)
+    X[rng.rand(*X.shape) < 0.25] = np.nan
+    return X[~np.isnan(X).all(axis=1)]
+
+
+def _expected(pipeline, X):
+    return pipeline.transform(pd.DataFrame(X, columns=FEATURES))
+
+
+@pytest.mark.parametrize("with_mean,with_std", [(True, True), (False, True), (True, False), (False, False)])
+@pytest.mark.parametrize("clip", [False, True])
+def test_complete_rows_match_pipeline(with_mean, with_std, clip):
+    pipeline, X = _fit(with_mean, with_std, clip)
+    compiled = CompiledPreprocessor.from_pipeline(pipeline)
+
+    assert np.array_equal(compiled.transform(X), _expected(pipeline, X))
+    assert compiled.verify(pipeline)
+
+
+@pytest.mark.parametrize("with_mean,with_std", [(True, True), (False, False)])
+@pytest.mark.parametrize("clip", [False, True])
+def test_rows_with_nans_match_pipeline(with_mean, with_std, clip):
+    pipeline, X = _fit(with_mean, with_std, clip)
+    X = _with_nans(X)
+    compiled = CompiledPreprocessor.from_pipeline(pipeline)
+
+    assert np.isnan(X).any()
+    assert np.array_equal(compiled.transform(X), _expected(pipeline, X))
+
+
+def test_reordered_columns():
+    pipeline, X = _fit()
+    X = _with_nans(X)
+    compiled = CompiledPreprocessor.from_pipeline(pipeline)
+    permutation = np.random.RandomState(2).permutation(len(FEATURES))
+    shuffled = X[:, permutation]
+    # For each feature in feature_names order, the shuffled column that holds it.
+    columns = np.argsort(permutation)
+
+    assert compiled.feature_names == FEATURES
+    assert np.array_equal(compiled.transform(shuffled, columns=columns), _expected(pipeline, X))
+
+
+def test_arrays_round_trip():
+    pipeline, X = _fit(clip=True)
+    X = _with_nans(X)
+    params, arrays = CompiledPreprocessor.from_pipeline(pipeline).to_arrays()
+    restored = CompiledPreprocessor.from_arrays(params, arrays)
+
+    assert np.array_equal(restored.transform(X), _expected(pipeline, X))
+
+
+def test_rejects_other_pipelines():
+    pipeline = Pipeline([("scaler", StandardScaler()), ("normalizer", MinMaxScaler())]).fit(np.eye(3))
+    with pytest.raises(ValueError):
+        CompiledPreprocessor.from_pipeline(pipeline)
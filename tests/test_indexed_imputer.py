@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from sklearn.impute import KNNImputer
+
+from healthapp.inference.imputer import IndexedKNNImputer
+
+
+def _queries(rng, n, n_features, high):
+    Q = np.round(rng.rand(n, n_features) * high)
+    Q[rng.rand(*Q.shape) < 0.3] = np.nan
+    return Q[np.isnan(Q).any(axis=1) & ~np.isnan(Q).all(axis=1)]
+
+
+@pytest.mark.parametrize("high", [3, 10, 300])
+@pytest.mark.parametrize("partial", [0.0, 0.03])
+def test_tied_donors_match_sklearn(high, partial):
+    # Small integer grids: most queries have several donors at the k-th distance.
+    rng = np.random.RandomState(high)
+    X = np.round(rng.rand(300, 5) * high)
+    X[rng.rand(*X.shape) < partial] = np.nan
+    X = X[~np.isnan(X).all(axis=1)]
+    reference = KNNImputer(n_neighbors=3).fit(X)
+    Q = _queries(rng, 600, 5, high)
+
+    imputed = IndexedKNNImputer.from_fitted(reference).transform(Q.copy())
+
+    assert np.array_equal(imputed, reference.transform(Q))
+
+
+def test_pickled_imputer_still_breaks_ties():
+    import pickle
+    rng = np.random.RandomState(0)
+    X = np.round(rng.rand(200, 4) * 3)
+    reference = KNNImputer(n_neighbors=5).fit(X)
+    imputer = pickle.loads(pickle.dumps(IndexedKNNImputer.from_fitted(reference)))
+    Q = _queries(rng, 300, 4, 3)
+
+    assert np.array_equal(imputer.transform(Q.copy()), reference.transform(Q))
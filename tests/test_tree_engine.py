@@ -0,0 +1,81 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import (AdaBoostClassifier, ExtraTreesClassifier, GradientBoostingClassifier,
+                              RandomForestClassifier)
+from sklearn.tree import DecisionTreeClassifier
+
+from healthapp.inference.trees import TreeEnsemble
+
+MODELS = {
+    "DecisionTree": lambda: DecisionTreeClassifier(random_state=0),
+    "RandomForest": lambda: RandomForestClassifier(n_estimators=30, random_state=0),
+    "ExtraTrees": lambda: ExtraTreesClassifier(n_estimators=30, random_state=0),
+    "GradientBoosting": lambda: GradientBoostingClassifier(n_estimators=30, random_state=0),
+    "AdaBoost": lambda: AdaBoostClassifier(n_estimators=30, random_state=0),
+}
+# sklearn's own predict accepts NaN for these (trees route missing values at fit time).
+NAN_MODELS = ("DecisionTree", "RandomForest", "ExtraTrees")
+
+
+def _data(n_classes, seed=0):
+    X, y = make_classification(n_samples=600, n_features=8, n_informative=5, n_classes=n_classes,
+                               random_state=seed)
+    # Rounded features give many rows exactly on a split threshold.
+    X = np.round(X, 1)
+    return X[:400], y[:400], X[400:]
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("name", list(MODELS))
+def test_predict_matches_sklearn(name, n_classes):
+    X, y, X_test = _data(n_classes)
+    model = MODELS[name]().fit(X, y)
+    engine = TreeEnsemble.from_estimator(model)
+
+    assert np.array_equal(engine.predict(X_test), model.predict(X_test))
+    assert np.array_equal(engine.predict(X), model.predict(X))
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("name", NAN_MODELS)
+def test_nan_inputs_match_sklearn(name, n_classes):
+    X, y, X_test = _data(n_classes)
+    rng = np.random.RandomState(1)
+    X[rng.rand(*X.shape) < 0.1] = np.nan
+    X_test[rng.rand(*X_test.shape) < 0.2] = np.nan
+    model = MODELS[name]().fit(X, y)
+    engine = TreeEnsemble.from_estimator(model)
+
+    assert np.array_equal(engine.predict(X_test), model.predict(X_test))
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("name", list(MODELS))
+def test_round_trips(name, n_classes):
+    X, y, X_test = _data(n_classes)
+    model = MODELS[name]().fit(X, y)
+    engine = TreeEnsemble.from_estimator(model)
+    expected = model.predict(X_test)
+
+    assert np.array_equal(pickle.loads(pickle.dumps(engine)).predict(X_test), expected)
+    params, arrays = engine.to_arrays()
+    assert np.array_equal(TreeEnsemble.from_arrays(params, arrays).predict(X_test), expected)
+
+
+def test_large_batches_take_the_blocked_path():
+    X, y, _ = _data(3)
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    engine = TreeEnsemble.from_estimator(model)
+    X_big = np.round(np.random.RandomState(2).normal(size=(2000, X.shape[1])), 1)
+
+    assert engine.verify(model, X_big)
+
+
+def test_rejects_unsupported_estimators():
+    from sklearn.linear_model import LogisticRegression
+    X, y, _ = _data(2)
+    with pytest.raises(ValueError):
+        TreeEnsemble.from_estimator(LogisticRegression().fit(X, y))